@@ -1,29 +1,69 @@
-from typing import List, Dict
+import numpy as np
+from typing import List, Dict, Sequence, Union
+
+# Menu.nutrients 배열의 영양소 순서
+NUTRIENT_NAMES = ['energy_kcal', 'carbohydrate_g', 'protein_g', 'fat_g', 'Ca_mg']
+
+class _Immutable:
+    # 메뉴·재료·끼니는 여러 식단이 같은 객체를 공유하므로 만든 뒤에는 바꿀 수 없게 한다.
+    # __dict__ 없이 __slots__만 두어 객체 하나의 크기를 줄인다
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+class Ingredient(_Immutable):
+    __slots__ = ('name', 'price', 'amount_g')
 
-class Ingredient:
     def __init__(self, name: str, price: float, amount_g: float):
-        self.name = name
-        self.price = price
-        self.amount_g = amount_g
-
-class Menu:
-    def __init__(self, name: str, nutrients: Dict[str, float], ingredients: List[Ingredient], category: str):
-        self.name = name
-        self.nutrients = nutrients
-        self.ingredients = ingredients
-        self.category = category
-
-class Meal:
-    def __init__(self, menus: List[Menu], date: str, meal_type: str):
-        self.menus = menus
-        self.date = date
-        self.meal_type = meal_type
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'price', price)
+        object.__setattr__(self, 'amount_g', amount_g)
+
+    def __reduce__(self):
+        return (Ingredient, (self.name, self.price, self.amount_g))
+
+class Menu(_Immutable):
+    __slots__ = ('name', 'nutrients', 'ingredients', 'category')
+
+    def __init__(self, name: str, nutrients: Union[Dict[str, float], Sequence[float]], ingredients: Sequence[Ingredient], category: str):
+        # 영양소는 이름 딕셔너리나 NUTRIENT_NAMES 순서의 값으로 받아 읽기 전용 float 배열로 둔다
+        if isinstance(nutrients, dict):
+            nutrients = [nutrients[nutrient] for nutrient in NUTRIENT_NAMES]
+        nutrients = np.array(nutrients, dtype=float)
+        nutrients.setflags(write=False)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'nutrients', nutrients)
+        object.__setattr__(self, 'ingredients', tuple(ingredients))
+        object.__setattr__(self, 'category', category)
+
+    def __reduce__(self):
+        return (Menu, (self.name, tuple(self.nutrients.tolist()), self.ingredients, self.category))
+
+class Meal(_Immutable):
+    __slots__ = ('menus', 'date', 'meal_type')
+
+    def __init__(self, menus: Sequence[Menu], date: str, meal_type: str):
+        object.__setattr__(self, 'menus', tuple(menus))
+        object.__setattr__(self, 'date', date)
+        object.__setattr__(self, 'meal_type', meal_type)
+
+    def __reduce__(self):
+        return (Meal, (self.menus, self.date, self.meal_type))
 
 class Diet:
-    def __init__(self, meals: List[Meal]):
-        self.meals = meals
+    # 바뀌지 않은 끼니는 다른 식단과 같은 Meal 객체를 함께 쓴다
+    __slots__ = ('meals',)
+
+    def __init__(self, meals: Sequence[Meal]):
+        self.meals = tuple(meals)
 
 class WeeklyDiet:
+    __slots__ = ('diets',)
+
     def __init__(self, diets: List[Diet]):
         self.diets = diets
 
@@ -31,4 +71,4 @@ class NutrientConstraints:
     def __init__(self, min_values: Dict[str, float], max_values: Dict[str, float], weights: Dict[str, float]):
         self.min_values = min_values
         self.max_values = max_values
-        self.weights = weights
\ No newline at end of file
+        self.weights = weights
@@ -1,26 +1,208 @@
 from Diet_class import Menu, Meal, Diet, NutrientConstraints
-from typing import List, Union, Dict
+from typing import List, Union, Dict, Tuple
+import os
+import time
 import numpy as np
-from evaluation_function import evaluate_nutrition, evaluate_cost, evaluate_harmony, evaluate_diversity
+from dataclasses import dataclass, replace
+from concurrent.futures import Executor
+from catalog import MenuCatalog, NUTRIENT_NAMES
+from evaluation_function import EvaluationContext, evaluate_population
+from parallel_fitness import create_fitness_executor, evaluate_population_parallel
+from fitness_cache import FitnessCache
+from delta_evaluation import DeltaEvaluator, ObjectiveState
+from telemetry import GenerationRecord, OptimizationObserver
+from archive import ParetoArchive, crowding_distance
+from checkpoint import save_checkpoint, load_checkpoint, fingerprint
+from harmony import SparseHarmony
+from local_search import LocalSearch
+from repair import NutritionRepair
+
+@dataclass
+class PopulationState:
+    # 세대 사이에 이어지는 개체군 상태. 적합도와 증분 평가 상태를 함께 들고 있어 다음 세대에서 다시 평가하지 않는다
+    population: np.ndarray
+    fitnesses: np.ndarray
+    objective_states: List[ObjectiveState]
+    generation: int = 0
+    archive: ParetoArchive = None
+
+def rolling_windows(n_meals: int, window_meals: int, step_meals: int, carry_meals: int) -> List[Tuple[int, int, int]]:
+    # optimize_rolling이 차례로 푸는 창들의 (붙여 평가할 확정 끼니의 시작, 최적화 시작, 끝) 끼니 위치
+    if not 0 < step_meals <= window_meals:
+        raise ValueError(f"step_meals must be in 1..window_meals, got {step_meals}")
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window_meals, n_meals)
+        windows.append((max(0, start - carry_meals), start, end))
+        if end >= n_meals:
+            return windows
+        start += step_meals
 
 class MultiObjectiveDietOptimizer:
-    def __init__(self, all_menus: List[Menu], nutrient_constraints: NutrientConstraints, harmony_matrix: np.ndarray):
-        self.all_menus = all_menus
+    def __init__(self, catalog: MenuCatalog, nutrient_constraints: NutrientConstraints, context: EvaluationContext, seed: int = None,
+                 n_workers: int = 1, executor: Executor = None, cache_size: int = 50000, delta_max_changes: int = None,
+                 mutation: str = 'category', n_neighbours: int = 10, mutation_rate: float = 0.1,
+                 archive_size: int = 200, target_improved_diets: int = 5, local_search_budget: int = 0,
+                 repair_rate: float = 0.0):
+        if mutation not in ('random', 'category', 'nearest'):
+            raise ValueError(f"Unknown mutation mode: {mutation}")
+        self.catalog = catalog
         self.nutrient_constraints = nutrient_constraints
-        self.harmony_matrix = harmony_matrix
+        self.context = context
+        self.rng = np.random.default_rng(seed)
+        # executor를 직접 넘길 때는 create_fitness_executor로 만들고, n_workers에 워커 수를 맞춰 준다
+        self.n_workers = n_workers
+        self.executor = executor
+        self._executor = executor
+        self.cache = FitnessCache(cache_size) if cache_size > 0 else None
+        # 부모와 다른 슬롯이 delta_max_changes개 이하인 자식은 부모 상태에서 증분 평가한다.
+        # None이면 전체 재평가(슬롯 수의 제곱)와 증분 평가(변경 수 x 슬롯 수)의 손익분기점인 슬롯 수의 1/16을 쓰고, 0이면 끈다
+        self.delta_max_changes = delta_max_changes
+        self.delta = DeltaEvaluator(context, catalog, nutrient_constraints) if delta_max_changes != 0 else None
+        # 'category': 같은 카테고리 메뉴로 교체, 'nearest': 같은 카테고리 중 영양소가 가까운 메뉴로 교체, 'random': 전체 메뉴에서 교체
+        self.mutation = mutation
+        self.n_neighbours = n_neighbours
+        self.mutation_rate = mutation_rate  # 끼니별 변이 확률
+        self.archive_size = archive_size  # 세대를 넘어 유지하는 비지배 식단 수의 상한
+        # 초기 식단보다 3개 이상의 목적에서 나은 식단이 이만큼 모이면 멈춘다. None이면 항상 지정한 세대 수만큼 돈다
+        self.target_improved_diets = target_improved_diets
+        # 0보다 크면 세대마다 아카이브 구성원에서 출발하는 지역 탐색에 최대 이만큼의 평가를 쓴다
+        self.local_search_budget = local_search_budget
+        self.local_search = None
+        if local_search_budget > 0:
+            self.local_search = LocalSearch(catalog, self.delta or DeltaEvaluator(context, catalog, nutrient_constraints))
+        # 0보다 크면 교차·변이로 만든 자식을 이 확률로 영양 기준 쪽으로 고친다
+        self.repair_rate = repair_rate
+        self.repair = NutritionRepair(catalog, nutrient_constraints) if repair_rate > 0 else None
+        # 변이·수선·지역 탐색이 바꾸지 않는 앞쪽 끼니 수. optimize_rolling이 창마다 앞서 확정한 끼니를 붙여 평가할 때 쓴다
+        self.frozen_meals = 0
+        self._harmony_fingerprint = None  # (조화 행렬 객체, 지문). 조화 데이터는 크므로 객체가 바뀔 때만 다시 계산한다
+        if mutation == 'nearest':
+            catalog.nearest_menus(n_neighbours)
         
-    def fitness(self, diet_db: Diet, weeklydiet: Diet) -> List[float]:
-        nutrition_score = evaluate_nutrition(weeklydiet, self.nutrient_constraints)
-        cost_score = evaluate_cost(diet_db, weeklydiet)
-        harmony_score = evaluate_harmony(diet_db, weeklydiet)
-        diversity_score = evaluate_diversity(weeklydiet)
-        
-        return [nutrition_score, cost_score, harmony_score, diversity_score]
+    def fitness(self, weeklydiet: Diet) -> List[float]:
+        return self.fitness_batch(self.catalog.encode_diet(weeklydiet)[np.newaxis])[0].tolist()
+
+    def fitness_batch(self, population: np.ndarray) -> np.ndarray:
+        if self.cache is None:
+            return self._evaluate(population)
+
+        fitnesses = np.empty((len(population), 4))
+        pending = {}
+        for i, genome in enumerate(population):
+            key = self.cache.key(genome)
+            if key in pending:  # 같은 배치 안의 중복 게놈은 한 번만 평가
+                pending[key].append(i)
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                pending[key] = [i]
+            else:
+                fitnesses[i] = cached
+
+        if pending:
+            values = self._evaluate(population[[indices[0] for indices in pending.values()]])
+            for (key, indices), value in zip(pending.items(), values):
+                fitnesses[indices] = value
+                self.cache.put(key, value.copy())
+
+        return fitnesses
+
+    def _fitness_offspring(self, offspring: np.ndarray, lineage: List[Tuple[int, ...]], parents: np.ndarray,
+                           parent_fitnesses: np.ndarray, parent_states: List[ObjectiveState]) -> Tuple[np.ndarray, List[ObjectiveState]]:
+        fitnesses = np.empty((len(offspring), 4))
+        states = [None] * len(offspring)
+        batch = []
+        max_changes = self.delta_max_changes if self.delta_max_changes is not None else max(1, offspring[0].size // 16)
+        for i, (child, candidates) in enumerate(zip(offspring, lineage)):
+            if self.delta is None:
+                batch.append(i)
+                continue
+
+            # 가장 적게 달라진 부모를 기준으로 삼는다
+            changes = [np.argwhere(child != parents[parent]) for parent in candidates]
+            best = min(range(len(candidates)), key=lambda k: len(changes[k]))
+            parent, changed = candidates[best], changes[best]
+            if len(changed) == 0:
+                fitnesses[i] = parent_fitnesses[parent]
+                states[i] = parent_states[parent]
+                continue
+            if len(changed) > max_changes:
+                batch.append(i)
+                continue
+
+            key = self.cache.key(child) if self.cache is not None else None
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                fitnesses[i] = cached
+                continue
+
+            if parent_states[parent] is None:
+                parent_states[parent] = self.delta.build(parents[parent])
+            states[i] = self.delta.apply(parent_states[parent], changed, child[changed[:, 0], changed[:, 1]])
+            fitnesses[i] = self.delta.scores(states[i])
+            if key is not None:
+                self.cache.put(key, fitnesses[i].copy())
+
+        if batch:
+            fitnesses[batch] = self.fitness_batch(offspring[batch])
+        return fitnesses, states
+
+    def reprice(self, prices_per_100g: Dict[str, float], cost_bounds: Tuple[float, float] = None) -> np.ndarray:
+        # 재료 가격이 바뀌면 카탈로그에서 그 재료가 들어간 메뉴 비용만 고치고, 이전 비용으로 계산한 적합도는 캐시에서 버린다.
+        # cost_bounds(예: HistoryModel.reprice 뒤의 cost_bounds())를 주면 비용 점수의 정규화 범위도 바꾼다.
+        # 워커 프로세스는 시작할 때 받은 카탈로그를 쓰므로, 직접 넘긴 executor는 이 뒤에 새로 만들어야 한다
+        changed = self.catalog.reprice(prices_per_100g)
+        if self.cache is not None and len(changed):
+            self.cache.clear()
+        if cost_bounds is not None:
+            self.context = replace(self.context, min_cost=cost_bounds[0], max_cost=cost_bounds[1])
+            if self.cache is not None:
+                self.cache.clear()
+            evaluators = [self.delta, self.local_search.delta if self.local_search is not None else None]
+            for evaluator in evaluators:
+                if evaluator is not None:
+                    evaluator.context = self.context
+                    evaluator.history_index = self.catalog.history_index(self.context)
+        return changed
+
+    def cache_stats(self) -> Dict[str, float]:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def _evaluate(self, population: np.ndarray) -> np.ndarray:
+        if self._executor is not None and len(population) > 1:
+            return evaluate_population_parallel(self._executor, population, self.n_workers)
+        return evaluate_population(self.context, self.catalog, population, self.nutrient_constraints)
 
     def dominates(self, a: List[float], b: List[float]) -> bool:
         return all(x >= y for x, y in zip(a, b)) and any(x > y for x, y in zip(a, b))
 
-    def non_dominated_sort(self, population: List[Diet], fitnesses: List[List[float]]) -> List[List[int]]:
+    def non_dominated_sort(self, population: np.ndarray, fitnesses: List[List[float]]) -> List[List[int]]:
+        fitnesses = np.asarray(fitnesses, dtype=float)
+        n = len(fitnesses)
+        if n == 0:
+            return []
+
+        # domination[i, j]: i가 j를 지배하는지 여부. 메모리를 제한하려고 행 블록 단위로 계산한다
+        domination = np.empty((n, n), dtype=bool)
+        for start in range(0, n, 1024):
+            block = fitnesses[start:start+1024, np.newaxis, :]
+            domination[start:start+1024] = (block >= fitnesses).all(axis=2) & (block > fitnesses).any(axis=2)
+
+        domination_counts = domination.sum(axis=0)
+        fronts = []
+        current = np.flatnonzero(domination_counts == 0)
+        while len(current) > 0:
+            fronts.append(current.tolist())
+            domination_counts[current] = -1
+            domination_counts -= domination[current].sum(axis=0)
+            current = np.flatnonzero(domination_counts == 0)
+
+        return fronts
+
+    def non_dominated_sort_reference(self, population: np.ndarray, fitnesses: List[List[float]]) -> List[List[int]]:
+        # 벡터화 이전의 O(M·N²) 구현. 동등성 검증용으로 남겨 둔다
         n = len(population)
         domination_counts = [0] * n
         dominated_solutions = [[] for _ in range(n)]
@@ -51,7 +233,10 @@ class MultiObjectiveDietOptimizer:
 
         return fronts[:-1]  # 마지막 빈 프론트 제거
 
-    def crowding_distance(self, fitnesses: List[List[float]]) -> List[float]:
+    def crowding_distance(self, fitnesses: List[List[float]]) -> np.ndarray:
+        return crowding_distance(fitnesses)
+
+    def crowding_distance_reference(self, fitnesses: List[List[float]]) -> List[float]:
         n = len(fitnesses)
         distances = [0.0] * n
         for i in range(len(fitnesses[0])):
@@ -65,80 +250,319 @@ class MultiObjectiveDietOptimizer:
 
         return distances
 
-    def selection(self, population: List[Diet], fitnesses: List[List[float]]) -> List[Diet]:
+    def selection(self, population: np.ndarray, fitnesses: List[List[float]]) -> np.ndarray:
+        return population[self.select_indices(population, fitnesses)]
+
+    def select_indices(self, population: np.ndarray, fitnesses: List[List[float]]) -> List[int]:
+        return self.best_indices(population, fitnesses, len(population) // 2)
+
+    def best_indices(self, population: np.ndarray, fitnesses: List[List[float]], n: int) -> List[int]:
+        # 프론트 순위, 같은 프론트 안에서는 혼잡 거리 순으로 상위 n개
         fronts = self.non_dominated_sort(population, fitnesses)
         selected = []
         for front in fronts:
-            if len(selected) + len(front) <= len(population) // 2:
+            if len(selected) + len(front) <= n:
                 selected.extend(front)
             else:
-                crowding_distances = self.crowding_distance([fitnesses[i] for i in front])
-                sorted_front = sorted(front, key=lambda i: crowding_distances[front.index(i)], reverse=True)
-                selected.extend(sorted_front[:len(population) // 2 - len(selected)])
+                # 프론트당 혼잡 거리를 한 번만 계산하고, 같은 거리는 원래 순서를 유지하며 내림차순 정렬
+                crowding_distances = self.crowding_distance(np.asarray(fitnesses)[front])
+                sorted_front = np.asarray(front)[np.argsort(-crowding_distances, kind='stable')]
+                selected.extend(sorted_front[:n - len(selected)].tolist())
                 break
-        return [population[i] for i in selected]
-
-    def crossover(self, parent1: Diet, parent2: Diet) -> Diet:
-        child_meals = []
-        for meal1, meal2 in zip(parent1.meals, parent2.meals):
-            child_menus = []
-            for menu1, menu2 in zip(meal1.menus, meal2.menus):
-                child_menus.append(menu1 if np.random.random() < 0.5 else menu2)
-            child_meals.append(Meal(child_menus, meal1.date, meal1.meal_type))
-        return Diet(child_meals)
-
-    def mutate(self, diet: Diet) -> Diet:
-        mutated_meals = []
-        for meal in diet.meals:
-            if np.random.random() < 0.1:  # 10% 확률로 변이
-                mutated_menus = []
-                for menu in meal.menus:
-                    if np.random.random() < 0.5:  # 50% 확률로 메뉴 변경
-                        new_menu = np.random.choice(self.all_menus)
-                        mutated_menus.append(new_menu)
-                    else:
-                        mutated_menus.append(menu)
-                mutated_meals.append(Meal(mutated_menus, meal.date, meal.meal_type))
-            else:
-                mutated_meals.append(meal)
-        return Diet(mutated_meals)
+        return selected
 
-    def optimize(self, diet_db: Diet, initial_diet: Diet, generations: int = 100, population_size: int = 50) -> List[Diet]:
-        population = [initial_diet] + [self.mutate(initial_diet) for _ in range(population_size - 1)]
-        initial_fitness = self.fitness(diet_db, initial_diet)
-        
-        for generation in range(generations):
-            fitnesses = [self.fitness(diet_db, weeklydiet) for weeklydiet in population]
-            
-            # 비지배 정렬을 통해 파레토 프론트 찾기
-            pareto_front_indices = self.non_dominated_sort(population, fitnesses)[0]
-            pareto_front = [population[i] for i in pareto_front_indices]
-            
-            # 종료 조건 확인
-            improved_diets = self.count_improved_diets(initial_fitness, pareto_front, diet_db)
-            if improved_diets >= 5:
-                print(f"Termination condition met at generation {generation}: {improved_diets} improved diets found.")
-                return pareto_front
+    def crossover(self, parent1: np.ndarray, parent2: np.ndarray) -> np.ndarray:
+        return np.where(self.rng.random(parent1.shape) < 0.5, parent1, parent2)
+
+    def mutate(self, genome: np.ndarray) -> np.ndarray:
+        n_meals, n_slots = genome.shape
+        meal_mask = self.rng.random(n_meals) < self.mutation_rate  # 기본 10% 확률로 변이
+        meal_mask[:self.frozen_meals] = False
+        slot_mask = (self.rng.random((n_meals, n_slots)) < 0.5) & meal_mask[:, np.newaxis] & (genome >= 0)  # 50% 확률로 메뉴 변경
+
+        mutated = genome.copy()
+        if self.mutation == 'category':
+            mutated[slot_mask] = self.catalog.sample_same_category(genome[slot_mask], self.rng)
+        elif self.mutation == 'nearest':
+            mutated[slot_mask] = self.catalog.sample_nearest(genome[slot_mask], self.rng, self.n_neighbours)
+        else:
+            mutated[slot_mask] = self.rng.integers(0, len(self.catalog), size=slot_mask.sum())
+        return mutated
+
+    def optimize(self, initial_diet: Diet, generations: int = 100, population_size: int = 50,
+                 observers: List[OptimizationObserver] = None, checkpoint_path: str = None, checkpoint_interval: int = 10,
+                 resume: bool = False) -> List[Diet]:
+        # checkpoint_path를 주면 checkpoint_interval세대마다(그리고 끝날 때) 상태를 저장한다.
+        # resume=True이고 그 파일이 있으면 저장된 세대부터 이어서 돌며, 끊기지 않은 실행과 같은 결과를 낸다
+        observers = observers or []
+        checkpoint = (checkpoint_path, checkpoint_interval, resume)
+        return self._with_executor(lambda: self._optimize(initial_diet, generations, population_size, observers, *checkpoint))
+
+    def optimize_rolling(self, initial_diet: Diet, window_meals: int = 21, step_meals: int = 14, carry_meals: int = 21,
+                         generations: int = 100, population_size: int = 50, observers: List[OptimizationObserver] = None) -> List[Diet]:
+        # 여러 주·한 달짜리 식단을 window_meals끼 창으로 나눠 step_meals끼씩 밀면서 앞에서부터 차례로 최적화한다.
+        # 창마다 바로 앞에서 확정한 carry_meals끼를 고정한 채 앞에 붙여 평가하므로, 다양성(같은 메뉴의 간격)은 창 경계를 넘어 이어진다.
+        # 창 하나의 평가 비용은 식단 길이와 무관해 전체 시간은 식단 길이에 비례한다 (한 번에 풀면 조화·다양성 평가가 길이의 제곱).
+        # 창이 끝나면 아카이브에서 하나를 골라(_commit_index) 그 창을 채우고, 겹치는 끼니는 다음 창이 그 값에서 다시 출발한다.
+        # 반환값은 마지막 창의 아카이브 구성원마다 앞서 확정한 끼니를 이어 붙인 전체 식단이다. 체크포인트는 지원하지 않는다
+        observers = observers or []
+        windows = rolling_windows(len(initial_diet.meals), window_meals, step_meals, carry_meals)
+        return self._with_executor(lambda: self._optimize_rolling(initial_diet, windows, generations, population_size, observers))
+
+    def _with_executor(self, run):
+        if self._executor is not None or self.n_workers <= 1:
+            return run()
+
+        with create_fitness_executor(self.context, self.catalog, self.nutrient_constraints, self.n_workers) as executor:
+            self._executor = executor
+            try:
+                return run()
+            finally:
+                self._executor = self.executor
+
+    def _notify_generation(self, observers: List[OptimizationObserver], generation: int, phase_seconds: Dict[str, float],
+                           evaluations: int, front_fitnesses: np.ndarray):
+        record = GenerationRecord(generation, phase_seconds, evaluations, front_fitnesses, self.cache_stats())
+        for observer in observers:
+            observer.on_generation(self, record)
+
+    def _finish(self, observers: List[OptimizationObserver], front_fitnesses: np.ndarray):
+        for observer in observers:
+            observer.on_finish(self, front_fitnesses)
+
+    def initial_population(self, initial_genome: np.ndarray, initial_fitness: List[float], population_size: int) -> PopulationState:
+        population = np.stack([initial_genome] + [self.mutate(initial_genome) for _ in range(population_size - 1)])
+        fitnesses, states = self._fitness_offspring(population, [(0,)] * population_size, initial_genome[np.newaxis],
+                                                    np.array([initial_fitness]), [None])
+        archive = ParetoArchive(initial_fitness, self.archive_size)
+        archive.insert(population, fitnesses)
+        return PopulationState(population, fitnesses, states, archive=archive)
+
+    def evolve(self, state: PopulationState, generations: int, observers: List[OptimizationObserver] = None,
+               pending_seconds: float = 0.0, pending_evaluations: int = 0) -> str:
+        # state를 최대 generations세대만큼 제자리에서 진행시키고 멈춘 이유를 돌려준다:
+        # 'improved'(개선 식단 target_improved_diets개 이상), 'stopped'(옵저버의 중지 요청), 'generations'(세대 수 소진).
+        # pending_*는 0세대 기록에 합산할 초기 개체군 평가 시간과 개수
+        observers = observers or []
+        clock = time.perf_counter
+        population_size = len(state.population)
+        for _ in range(generations):
+            # 종료 조건 확인: 아카이브가 개선 식단 수를 들고 있으므로 프론트를 다시 구하지 않는다
+            stopped = any(observer.should_stop(self) for observer in observers)
+            improved = self.target_improved_diets is not None and state.archive.improved_count >= self.target_improved_diets
+            if improved or stopped:
+                if observers:
+                    self._notify_generation(observers, state.generation, {'evaluation': pending_seconds},
+                                            pending_evaluations, state.archive.fitnesses)
+                return 'stopped' if stopped else 'improved'
             
-            parents = self.selection(population, fitnesses)
+            phase_start = clock()
+            selected = self.select_indices(state.population, state.fitnesses.tolist())
+            parents, parent_fitnesses = state.population[selected], state.fitnesses[selected]
+            parent_states = [state.objective_states[i] for i in selected]
+            selection_seconds = clock() - phase_start
             
+            phase_start = clock()
             offspring = []
+            lineage = []
             while len(offspring) < population_size - len(parents):
-                if np.random.random() < 0.7:  # 70% 확률로 교차
-                    child = self.crossover(*np.random.choice(parents, 2, replace=False))
+                if self.rng.random() < 0.7:  # 70% 확률로 교차
+                    first, second = self.rng.choice(len(parents), 2, replace=False)
+                    child = self.crossover(parents[first], parents[second])
+                    lineage.append((first, second))
                 else:
-                    child = self.mutate(np.random.choice(parents))
+                    parent = self.rng.integers(len(parents))
+                    child = self.mutate(parents[parent])
+                    lineage.append((parent,))
                 offspring.append(child)
             
-            population = parents + offspring
+            offspring = np.reshape(offspring, (-1,) + parents.shape[1:])
+            if self.repair is not None:
+                offspring = self.repair.repair(offspring, self.rng, self.repair_rate, self.frozen_meals)
+            variation_seconds = clock() - phase_start
+            
+            phase_start = clock()
+            offspring_fitnesses, offspring_states = self._fitness_offspring(offspring, lineage, parents, parent_fitnesses, parent_states)
+            evaluation_seconds = clock() - phase_start
+            
+            # 아카이브 갱신 (telemetry의 sorting 단계)
+            phase_start = clock()
+            state.archive.insert(offspring, offspring_fitnesses)
+            sorting_seconds = clock() - phase_start
+            state.population = np.concatenate([parents, offspring])
+            state.fitnesses = np.concatenate([parent_fitnesses, offspring_fitnesses])
+            state.objective_states = parent_states + offspring_states
+            
+            phase_start = clock()
+            local_evaluations = self._local_search(state) if self.local_search is not None else 0
+            local_search_seconds = clock() - phase_start
+            if observers:
+                phase_seconds = {'evaluation': pending_seconds + evaluation_seconds, 'sorting': sorting_seconds,
+                                 'selection': selection_seconds, 'variation': variation_seconds, 'local_search': local_search_seconds}
+                self._notify_generation(observers, state.generation, phase_seconds, pending_evaluations + len(offspring) + local_evaluations,
+                                        state.archive.fitnesses)
+            pending_seconds, pending_evaluations = 0.0, 0
+            state.generation += 1
         
-        print(f"Maximum generations reached. Best result so far: {len(pareto_front)} solutions in Pareto front.")
-        return pareto_front
+        return 'generations'
+
+    def _local_search(self, state: PopulationState) -> int:
+        # 무작위 순서의 아카이브 구성원에서 출발해 예산을 다 쓸 때까지 지역 탐색한다.
+        # 나아진 식단은 아카이브에 넣고, 그 식단이 지배하는 개체가 있으면 그 자리를 대신한다
+        archive = state.archive
+        evaluations = 0
+        results = []
+        # 한 구성원이 예산을 다 쓰지 않도록 구성원당 예산의 1/4까지만 쓴다
+        member_budget = max(1, self.local_search_budget // 4)
+        for index in self.rng.permutation(len(archive)).tolist():
+            if evaluations >= self.local_search_budget:
+                break
+            objective_state, fitness, used = self.local_search.improve(archive.genomes[index], archive.fitnesses[index],
+                                                                       min(member_budget, self.local_search_budget - evaluations), self.rng,
+                                                                       self.frozen_meals)
+            evaluations += used
+            if not np.array_equal(fitness, archive.fitnesses[index]):
+                results.append((objective_state, fitness))
+
+        if results:
+            archive.insert(np.stack([objective_state.genome for objective_state, _ in results]), np.array([fitness for _, fitness in results]))
+            for objective_state, fitness in results:
+                dominated = np.flatnonzero((state.fitnesses <= fitness).all(axis=1) & (state.fitnesses < fitness).any(axis=1))
+                if len(dominated) > 0:
+                    state.population[dominated[0]] = objective_state.genome
+                    state.fitnesses[dominated[0]] = fitness
+                    state.objective_states[dominated[0]] = objective_state
+        return evaluations
+
+    def _optimize(self, initial_diet: Diet, generations: int, population_size: int, observers: List[OptimizationObserver],
+                  checkpoint_path: str, checkpoint_interval: int, resume: bool) -> List[Diet]:
+        if self.cache is not None:
+            self.cache.reset_stats()
+        phase_start = time.perf_counter()
+        initial_genome = self.catalog.encode_diet(initial_diet)
+        initial_fitness = self.fitness(initial_diet)
+        if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+            state = self.load_checkpoint(checkpoint_path, initial_genome, initial_fitness, population_size)
+            initial_evaluations = 0
+        else:
+            state = self.initial_population(initial_genome, initial_fitness, population_size)
+            initial_evaluations = population_size
+        initial_seconds = time.perf_counter() - phase_start
+        for observer in observers:
+            observer.on_start(self, initial_fitness, state.fitnesses)
+        
+        # 체크포인트 사이의 세대를 나눠 돌아도 evolve는 세대마다 같은 일을 하므로 한 번에 돈 것과 결과가 같다
+        interval = max(1, checkpoint_interval) if checkpoint_path is not None else max(1, generations)
+        reason = 'generations'
+        while reason == 'generations' and state.generation < generations:
+            reason = self.evolve(state, min(interval, generations - state.generation), observers, initial_seconds, initial_evaluations)
+            initial_seconds, initial_evaluations = 0.0, 0
+            if checkpoint_path is not None:
+                self.save_checkpoint(checkpoint_path, state, initial_genome)
+        archive = state.archive
+        if reason == 'improved':
+            print(f"Termination condition met at generation {state.generation}: {archive.improved_count} improved diets found.")
+        elif reason == 'stopped':
+            print(f"Optimization stopped at generation {state.generation}.")
+        else:
+            print(f"Maximum generations reached. Best result so far: {len(archive)} solutions in Pareto archive.")
+        
+        if observers:
+            self._finish(observers, archive.fitnesses)
+        return self.catalog.decode_genomes(archive.genomes, initial_diet, initial_genome)
+
+    def _optimize_rolling(self, initial_diet: Diet, windows: List[Tuple[int, int, int]], generations: int, population_size: int,
+                          observers: List[OptimizationObserver]) -> List[Diet]:
+        if self.cache is not None:
+            self.cache.reset_stats()
+        initial_genome = self.catalog.encode_diet(initial_diet)
+        plan = initial_genome.copy()
+        generation = 0
+        for window, (carry, start, end) in enumerate(windows):
+            window_genome = plan[carry:end]
+            window_fitness = self.fitness_batch(window_genome[np.newaxis])[0].tolist()
+            self.frozen_meals = start - carry
+            try:
+                state = self.initial_population(window_genome, window_fitness, population_size)
+                for observer in observers:
+                    if window == 0:
+                        observer.on_start(self, window_fitness, state.fitnesses)
+                    observer.on_window(self, window, window_fitness, state.fitnesses)
+                # 옵저버가 보는 세대 번호는 창을 넘어 이어진다
+                state.generation = generation
+                reason = self.evolve(state, generations, observers)
+            finally:
+                self.frozen_meals = 0
+            generation = state.generation
+            archive = state.archive
+            if reason == 'stopped' or window == len(windows) - 1:
+                break
+            plan[carry:end] = archive.genomes[self._commit_index(archive, window_fitness)]
+
+        print(f"Rolling horizon finished {window + 1}/{len(windows)} windows at generation {generation}: "
+              f"{len(archive)} solutions in the last window's Pareto archive.")
+        if observers:
+            self._finish(observers, archive.fitnesses)
+        # 멈춘 경우 아직 다루지 않은 뒤쪽 끼니는 초기 식단 그대로 남는다
+        genomes = np.repeat(plan[np.newaxis], len(archive), axis=0)
+        genomes[:, carry:end] = archive.genomes
+        return self.catalog.decode_genomes(genomes, initial_diet, initial_genome)
+
+    @staticmethod
+    def _commit_index(archive: ParetoArchive, initial_fitness: List[float]) -> int:
+        # 창의 초기 식단보다 나아진 목적 수가 가장 많은 구성원, 같으면 목적별 점수 증가의 합이 큰 구성원
+        gains = archive.fitnesses - np.asarray(initial_fitness)
+        return int(np.lexsort((gains.sum(axis=1), (gains > 0).sum(axis=1)))[-1])
+
+    def checkpoint_config(self) -> Dict:
+        # 탐색 경로를 바꾸는 설정. 체크포인트에 함께 저장하고 이어 달릴 때 현재 설정과 맞춰 본다
+        return {
+            'mutation': self.mutation,
+            'mutation_rate': self.mutation_rate,
+            'n_neighbours': self.n_neighbours,
+            'archive_size': self.archive_size,
+            'local_search_budget': self.local_search_budget,
+            'repair_rate': self.repair_rate,
+            'data_fingerprint': self.data_fingerprint(),
+        }
+
+    def data_fingerprint(self) -> str:
+        # 적합도를 정하는 데이터(메뉴 순서·비용·영양소, 영양 기준, 과거 식단의 조화 행렬과 정규화 범위)의 지문.
+        # 재료 가격을 바꾸거나 과거 식단이 늘어난 뒤에는 이전 체크포인트의 적합도를 그대로 이어 쓸 수 없다
+        harmony = self.context.harmony_matrix
+        if self._harmony_fingerprint is None or self._harmony_fingerprint[0] is not harmony:
+            if isinstance(harmony, SparseHarmony):
+                arrays = (np.array(harmony.menus, dtype=str), harmony.menu_counts, harmony.pair_keys, harmony.pair_counts)
+            else:
+                arrays = (np.array(self.context.menus, dtype=str), np.asarray(harmony))
+            self._harmony_fingerprint = (harmony, fingerprint(*arrays))
+
+        context = self.context
+        scalars = np.array([context.min_harmony, context.max_harmony, context.min_cost, context.max_cost, context.horizon_meals], dtype=float)
+        constraints = np.array([[self.nutrient_constraints.min_values[nutrient], self.nutrient_constraints.max_values[nutrient]]
+                                for nutrient in NUTRIENT_NAMES], dtype=float)
+        return fingerprint(np.array(self.catalog.names, dtype=str), self.catalog.costs, self.catalog.nutrients, constraints, scalars,
+                           np.array(self._harmony_fingerprint[1]))
+
+    def save_checkpoint(self, path: str, state: PopulationState, initial_genome: np.ndarray):
+        save_checkpoint(path, state.population, state.fitnesses, state.generation, state.archive,
+                        self.rng.bit_generator.state, initial_genome, self.checkpoint_config())
+
+    def load_checkpoint(self, path: str, initial_genome: np.ndarray, initial_fitness: List[float], population_size: int) -> PopulationState:
+        checkpoint = load_checkpoint(path, initial_fitness, self.checkpoint_config())
+        if not np.array_equal(checkpoint['initial_genome'], initial_genome):
+            raise ValueError(f"Checkpoint {path} was written for a different initial diet")
+        if len(checkpoint['population']) != population_size:
+            raise ValueError(f"Checkpoint {path} has population size {len(checkpoint['population'])}, expected {population_size}")
+
+        self.rng.bit_generator.state = checkpoint['rng_state']
+        # 증분 평가 상태는 저장하지 않는다. 부모로 쓰일 때 게놈에서 다시 만들며, 값은 이어서 돈 경우와 비트 단위로 같다
+        return PopulationState(checkpoint['population'], checkpoint['fitnesses'], [None] * population_size,
+                               checkpoint['generation'], checkpoint['archive'])
 
-    def count_improved_diets(self, initial_fitness: List[float], pareto_front: List[Diet], diet_db: Diet) -> int:
+    def count_improved_diets(self, initial_fitness: List[float], front_fitnesses: List[List[float]]) -> int:
         improved_count = 0
-        for diet in pareto_front:
-            current_fitness = self.fitness(diet_db, diet)
+        for current_fitness in front_fitnesses:
             improvements = sum(1 for init, curr in zip(initial_fitness, current_fitness) if curr > init)
             if improvements >= 3:
                 improved_count += 1
@@ -1,11 +1,18 @@
 import streamlit as st
 import pandas as pd 
 import numpy as np 
-from load_data import load_and_process_data, create_nutrient_constraints, load_all_menus, load_sample_file
-from evaluation_function import calculate_harmony_matrix, get_top_n_harmony_pairs
-from MOO import MultiObjectiveDietOptimizer
+from load_data import load_and_process_data, create_nutrient_constraints, load_all_menus, load_sample_file, get_file_path
+from evaluation_function import build_evaluation_context, MEALS_PER_WEEK
+from MOO import MultiObjectiveDietOptimizer, rolling_windows
+from catalog import MenuCatalog
 from utils import diet_to_dataframe, count_menu_changes
+from jobs import JobManager, OBJECTIVE_NAMES
+from history_analytics import HistoryAnalytics, get_history_analytics
+from data_cache import source_signature
+import hashlib
+import io
 import os
+import time
 
 # Set page config
 st.set_page_config(page_title="식단 최적화 프로그램", page_icon="🍽️", layout="wide")
@@ -55,24 +62,58 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def get_file_path(filename):
-    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    return os.path.join(base_path, 'data', filename)
-    
-@st.cache_data
-def load_data():
+# 과거 식단·메뉴·가격 파일. 파일 버전(source_signature)이 바뀌면 데이터를 다시 읽고, 이전 최적화 작업과 체크포인트도 쓰지 않는다
+DATA_FILES = ['DIET_2401.xlsx', 'Menu_ingredient_nutrient.xlsx', 'Ingredient_Price.xlsx']
+
+# 카탈로그·평가 기준·식단은 만든 뒤 바꾸지 않으므로 cache_resource로 한 객체를 공유한다.
+# cache_data는 재실행(진행 상황 확인으로 0.5초마다)마다 피클 사본을 새로 만들고, 카탈로그가 기억한 색인도 잃는다.
+# data_version은 본문에서 쓰지 않고 캐시 키로만 쓴다
+@st.cache_resource
+def load_data(data_version):
     diet_db_path = get_file_path('DIET_2401.xlsx')
     menu_db_path = get_file_path('Menu_ingredient_nutrient.xlsx')
     ingre_db_path = get_file_path('Ingredient_Price.xlsx')
     
     diet_db = load_and_process_data(diet_db_path, menu_db_path, ingre_db_path)
     nutrient_constraints = create_nutrient_constraints()
-    harmony_matrix, menus, menu_counts, _ = calculate_harmony_matrix(diet_db)
-    all_menus = load_all_menus(menu_db_path, ingre_db_path)
+    context = build_evaluation_context(diet_db)
+    catalog = MenuCatalog(load_all_menus(menu_db_path, ingre_db_path))
     
-    return diet_db, nutrient_constraints, harmony_matrix, menus, menu_counts, all_menus
+    return diet_db, nutrient_constraints, context, catalog
+
+@st.cache_resource
+def load_uploaded_diet(file_bytes: bytes, data_version):
+    return load_and_process_data(io.BytesIO(file_bytes), get_file_path('Menu_ingredient_nutrient.xlsx'), get_file_path('Ingredient_Price.xlsx'))
+
+@st.cache_resource
+def get_job_manager():
+    # 세션과 재실행에 걸쳐 하나만 두어, 끝난 결과를 (파일 해시, 파라미터)로 다시 꺼내 쓴다
+    return JobManager()
+
+# 1주보다 긴 식단은 2주 창을 1주씩 밀며 차례로 최적화한다
+ROLLING_WINDOW = (2 * MEALS_PER_WEEK, MEALS_PER_WEEK, MEALS_PER_WEEK)
 
-diet_db, nutrient_constraints, harmony_matrix, menus, menu_counts, all_menus = load_data()
+def planned_generations(weekly_diet, generations):
+    # 진행 표시줄의 전체 세대 수. 긴 식단은 창마다 generations세대씩 돈다
+    if len(weekly_diet.meals) <= MEALS_PER_WEEK:
+        return generations
+    return generations * len(rolling_windows(len(weekly_diet.meals), *ROLLING_WINDOW))
+
+def run_optimization(job, weekly_diet, generations, population_size, checkpoint_path):
+    # 서버가 재시작돼도 같은 작업은 마지막 체크포인트부터 이어서 돈다 (긴 식단의 창별 최적화는 체크포인트 없이 처음부터)
+    optimizer = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context)
+    if len(weekly_diet.meals) > MEALS_PER_WEEK:
+        pareto_front = optimizer.optimize_rolling(weekly_diet, *ROLLING_WINDOW, generations, population_size, observers=[job])
+    else:
+        pareto_front = optimizer.optimize(weekly_diet, generations, population_size, observers=[job],
+                                          checkpoint_path=checkpoint_path, checkpoint_interval=10, resume=True)
+    return {'front': [(diet, optimizer.fitness(diet)) for diet in pareto_front], 'cache_stats': optimizer.cache_stats()}
+
+data_version = source_signature([get_file_path(filename) for filename in DATA_FILES])
+diet_db, nutrient_constraints, context, catalog = load_data(data_version)
+# 재실행마다 다시 계산하지 않도록 과거 식단 파일 버전별로 한 번만 만든다
+history = get_history_analytics(source_signature([get_file_path('DIET_2401.xlsx')]),
+                                lambda: HistoryAnalytics.from_history(context.harmony_matrix, diet_db))
 
 # Streamlit 앱 시작
 st.title('🍽️ 식단 최적화 프로그램')
@@ -93,7 +134,7 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader('🍽️ 가장 많이 함께 나온 메뉴 조합')
-    top_5_pairs = get_top_n_harmony_pairs(harmony_matrix, menus, 5)
+    top_5_pairs = history.top_pairs(5)
     for i, (menu1, menu2, frequency) in enumerate(top_5_pairs, 1):
         emoji_rank = ['🥇', '🥈', '🥉', '4️⃣', '5️⃣'][i-1]
         st.markdown(f"""
@@ -105,7 +146,7 @@ with col1:
 
 with col2:
     st.subheader('🍲 가장 자주 나온 메뉴')
-    top_5_menus = menu_counts.most_common(5)
+    top_5_menus = history.top_menus(5)
     for i, (menu, occurrences) in enumerate(top_5_menus, 1):
         emoji_rank = ['🥇', '🥈', '🥉', '4️⃣', '5️⃣'][i-1]
         st.markdown(f"""
@@ -115,6 +156,16 @@ with col2:
         </div>
         """, unsafe_allow_html=True)
 
+with st.expander('🔎 메뉴별·카테고리별 상세 보기'):
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_menu = st.selectbox('메뉴', [menu for menu, _ in history.top_menus(len(context.menus))])
+        st.dataframe(pd.DataFrame(history.top_partners(selected_menu, 10), columns=['함께 나온 메뉴', '횟수']), use_container_width=True)
+    with col2:
+        top_by_category = history.top_menus_by_category(3)
+        selected_category = st.selectbox('카테고리', list(top_by_category))
+        st.dataframe(pd.DataFrame(top_by_category[selected_category], columns=['메뉴', '횟수']), use_container_width=True)
+
 # 초기 식단 업로드 (이전과 동일)
 st.header('📤 초기 식단 업로드')
 uploaded_file = st.file_uploader("초기 식단 Excel 파일을 업로드하세요", type="xlsx")
@@ -130,63 +181,99 @@ def calculate_improvements(initial_fitness, optimized_fitness):
     return improvements
 
 if uploaded_file is not None:
-    menu_db_path = get_file_path('Menu_ingredient_nutrient.xlsx')
-    ingre_db_path = get_file_path('Ingredient_Price.xlsx')
-    
-    #import_sample = load_sample_file(uploaded_file)
-    weekly_diet = load_and_process_data(uploaded_file, menu_db_path, ingre_db_path)
-    
-    optimizer = MultiObjectiveDietOptimizer(all_menus, nutrient_constraints, harmony_matrix)
-    initial_fitness = optimizer.fitness(diet_db, weekly_diet)
-    
-    st.subheader('📅 초기 식단')
-    st.dataframe(diet_to_dataframe(weekly_diet, "Initial Diet"), use_container_width=True)
+    file_bytes = uploaded_file.getvalue()
+    weekly_diet = load_uploaded_diet(file_bytes, data_version)
+
+    optimizer = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context)
+    initial_fitness = optimizer.fitness(weekly_diet)
+
+    initial_table = diet_to_dataframe(weekly_diet, "Initial Diet")
+    st.subheader(f'📅 초기 식단 ({initial_table.shape[1]}일)')
+    st.dataframe(initial_table, use_container_width=True)
     st.info(f"📊 초기 식단 적합도: 영양({initial_fitness[0]:.2f}), 비용({initial_fitness[1]:.2f}), 조화({initial_fitness[2]:.2f}), 다양성({initial_fitness[3]:.2f})")
-        
-if st.button('🚀 식단 최적화 시작'):
-    with st.spinner('최적화 진행 중...'):
-        pareto_front = optimizer.optimize(diet_db, weekly_diet, generations, population_size)
-    
-    st.success('최적화 완료!')
-    
-    # 3가지 이상 개선된 식단 선별
-    improved_diets = []
-    for optimized_diet in pareto_front:
-        optimized_fitness = optimizer.fitness(diet_db, optimized_diet)
-        improvements = calculate_improvements(initial_fitness, optimized_fitness)
-        if sum(1 for imp in improvements if imp > 0) >= 3:
-            improved_diets.append((optimized_diet, optimized_fitness, improvements))
-    
-    # 최대 5개까지 선별
-    improved_diets = improved_diets[:5]
-    
-    if improved_diets:
-        st.subheader('🏆 아래 식단으로 바꿔보는건 어떨까요?')
-        for i, (optimized_diet, optimized_fitness, improvements) in enumerate(improved_diets, 1):
-            st.markdown(f"### 제안 식단 {i}")
-            st.dataframe(diet_to_dataframe(optimized_diet, f"Optimized Diet {i}"), use_container_width=True)
-            
-            col1, col2, col3, col4 = st.columns(4)
+
+    # 최적화는 백그라운드 스레드에서 돌고, 이 스크립트는 세션에 저장한 작업 ID로 진행 상황만 읽어 온다
+    jobs = get_job_manager()
+    # 데이터 버전도 키에 넣어, 메뉴·가격·과거 식단이 바뀌면 체크포인트 파일 이름이 달라져 처음부터 다시 돈다
+    job_key = (hashlib.sha256(file_bytes).hexdigest(), generations, population_size, data_version)
+    checkpoint_path = get_file_path(os.path.join('.cache', 'checkpoints', hashlib.sha256(repr(job_key).encode()).hexdigest()[:16] + '.npz'))
+    if st.button('🚀 식단 최적화 시작'):
+        job = jobs.submit(job_key, planned_generations(weekly_diet, generations), lambda job: run_optimization(job, weekly_diet, generations, population_size, checkpoint_path))
+        st.session_state['job_id'] = job.job_id
+
+    job = jobs.get(st.session_state.get('job_id'))
+    if job is not None and job.key != job_key:
+        job = None  # 파일이나 파라미터가 바뀌면 이전 작업은 보여 주지 않는다
+
+    if job is not None and not job.finished:
+        snapshot = job.snapshot()
+        st.progress(min(snapshot['generation'] / snapshot['generations'], 1.0),
+                    text=f"최적화 진행 중... {snapshot['generation']}/{snapshot['generations']} 세대")
+        if st.button('⏹️ 최적화 중지'):
+            job.cancel()
+
+        if snapshot['history']:
+            col1, col2 = st.columns(2)
             with col1:
-                st.metric("영양 점수", f"{optimized_fitness[0]:.2f}", f"{improvements[0]:.2f}%")
+                st.markdown('#### 현재 파레토 프론트')
+                st.dataframe(pd.DataFrame(snapshot['front_fitnesses'], columns=['영양', '비용', '조화', '다양성']), use_container_width=True)
             with col2:
-                st.metric("비용 점수", f"{optimized_fitness[1]:.2f}", f"{improvements[1]:.2f}%")
-            with col3:
-                st.metric("조화 점수", f"{optimized_fitness[2]:.2f}", f"{improvements[2]:.2f}%")
-            with col4:
-                st.metric("다양성 점수", f"{optimized_fitness[3]:.2f}", f"{improvements[3]:.2f}%")
+                st.markdown('#### 세대별 최고 점수')
+                st.line_chart(pd.DataFrame(snapshot['history']).set_index('generation')[OBJECTIVE_NAMES])
+
+        time.sleep(0.5)
+        st.experimental_rerun()
+
+    if job is not None and job.status == 'failed':
+        st.error('최적화 중 오류가 발생했습니다.')
+        st.code(job.error)
+
+    if job is not None and job.status in ('done', 'cancelled'):
+        if job.status == 'cancelled':
+            st.warning(f'{job.generation}세대에서 최적화를 중지했습니다. 그때까지 찾은 식단을 보여 드립니다.')
+        else:
+            st.success('최적화 완료!')
+        cache_stats = job.result['cache_stats']
+        if cache_stats:
+            st.caption(f"적합도 캐시: 적중 {cache_stats['hits']}회, 평가 {cache_stats['misses']}회 (적중률 {cache_stats['hit_rate']:.0%})")
+
+        # 3가지 이상 개선된 식단 선별
+        improved_diets = []
+        for optimized_diet, optimized_fitness in job.result['front']:
+            improvements = calculate_improvements(initial_fitness, optimized_fitness)
+            if sum(1 for imp in improvements if imp > 0) >= 3:
+                improved_diets.append((optimized_diet, optimized_fitness, improvements))
+
+        # 최대 5개까지 선별
+        improved_diets = improved_diets[:5]
+
+        if improved_diets:
+            st.subheader('🏆 아래 식단으로 바꿔보는건 어떨까요?')
+            for i, (optimized_diet, optimized_fitness, improvements) in enumerate(improved_diets, 1):
+                st.markdown(f"### 제안 식단 {i}")
+                st.dataframe(diet_to_dataframe(optimized_diet, f"Optimized Diet {i}"), use_container_width=True)
             
-            menu_changes = count_menu_changes(weekly_diet, optimized_diet)
-            st.markdown('#### 📈 카테고리별 메뉴 변경 비율')
-            for category, counts in menu_changes.items():
-                percentage = (counts['changed'] / counts['total']) * 100 if counts['total'] > 0 else 0
-                st.markdown(f"""
-                <div class="menu-item">
-                    <strong>{category}</strong>: {counts['changed']}/{counts['total']} ({percentage:.2f}%)
-                </div>
-                """, unsafe_allow_html=True)
-    else:
-        st.warning("3가지 이상 개선된 식단을 찾지 못했습니다. 다시 시도해보세요.")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("영양 점수", f"{optimized_fitness[0]:.2f}", f"{improvements[0]:.2f}%")
+                with col2:
+                    st.metric("비용 점수", f"{optimized_fitness[1]:.2f}", f"{improvements[1]:.2f}%")
+                with col3:
+                    st.metric("조화 점수", f"{optimized_fitness[2]:.2f}", f"{improvements[2]:.2f}%")
+                with col4:
+                    st.metric("다양성 점수", f"{optimized_fitness[3]:.2f}", f"{improvements[3]:.2f}%")
+            
+                menu_changes = count_menu_changes(weekly_diet, optimized_diet)
+                st.markdown('#### 📈 카테고리별 메뉴 변경 비율')
+                for category, counts in menu_changes.items():
+                    percentage = (counts['changed'] / counts['total']) * 100 if counts['total'] > 0 else 0
+                    st.markdown(f"""
+                    <div class="menu-item">
+                        <strong>{category}</strong>: {counts['changed']}/{counts['total']} ({percentage:.2f}%)
+                    </div>
+                    """, unsafe_allow_html=True)
+        else:
+            st.warning("3가지 이상 개선된 식단을 찾지 못했습니다. 다시 시도해보세요.")
 
 st.markdown("---")
 st.caption("© 2024 식단 최적화 프로그램. All rights reserved.")
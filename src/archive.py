@@ -0,0 +1,93 @@
+import numpy as np
+from typing import List
+
+def crowding_distance(fitnesses: np.ndarray) -> np.ndarray:
+    fitnesses = np.asarray(fitnesses, dtype=float)
+    n, n_objectives = fitnesses.shape
+    distances = np.zeros(n)
+    for i in range(n_objectives):
+        sorted_indices = np.argsort(fitnesses[:, i], kind='stable')
+        sorted_values = fitnesses[sorted_indices, i]
+        distances[sorted_indices[0]] = distances[sorted_indices[-1]] = float('inf')
+        norm = sorted_values[-1] - sorted_values[0]
+        if norm == 0:
+            continue
+        distances[sorted_indices[1:-1]] += (sorted_values[2:] - sorted_values[:-2]) / norm
+
+    return distances
+
+class ParetoArchive:
+    # 지금까지 평가한 모든 식단 중 서로 지배하지 않는 것들의 모음.
+    # 첫 번째 목적(영양) 내림차순으로 정렬해 두어, 새 점을 지배할 수 있는 쪽(앞)과 새 점이 지배할 수 있는 쪽(뒤)만 비교한다.
+    # 적합도가 같은 점은 먼저 들어온 것만 남기고, max_size를 넘으면 혼잡 거리가 가장 작은 점부터 뺀다
+    def __init__(self, initial_fitness: List[float], max_size: int = 200):
+        self.initial_fitness = np.asarray(initial_fitness, dtype=float)
+        self.max_size = max_size
+        self.genomes: List[np.ndarray] = []
+        self.fitnesses = np.empty((0, len(self.initial_fitness)))
+        # 초기 식단보다 3개 이상의 목적에서 나은 구성원 수를 삽입·삭제 때마다 갱신해, 종료 조건 확인을 O(1)로 만든다
+        self.improved = np.zeros(0, dtype=bool)
+        self.improved_count = 0
+
+    @classmethod
+    def from_arrays(cls, initial_fitness: List[float], max_size: int, genomes: np.ndarray, fitnesses: np.ndarray) -> 'ParetoArchive':
+        # 저장해 둔 구성원을 순서 그대로 되살린다 (다시 삽입하면 같은 적합도 값끼리의 순서가 바뀔 수 있다)
+        archive = cls(initial_fitness, max_size)
+        archive.genomes = [genome for genome in np.asarray(genomes)]
+        archive.fitnesses = np.asarray(fitnesses, dtype=float).reshape(len(archive.genomes), len(archive.initial_fitness))
+        archive.improved = (archive.fitnesses > archive.initial_fitness).sum(axis=1) >= 3
+        archive.improved_count = int(archive.improved.sum())
+        return archive
+
+    def __len__(self) -> int:
+        return len(self.genomes)
+
+    def insert(self, genomes: np.ndarray, fitnesses: np.ndarray) -> int:
+        fitnesses = np.asarray(fitnesses, dtype=float)
+        if len(self.genomes) > 0:
+            # 기존 구성원에게 약하게라도 지배되는 후보는 한 번에 걸러 낸다
+            weakly_dominated = (fitnesses[:, np.newaxis, :] <= self.fitnesses[np.newaxis, :, :]).all(axis=2).any(axis=1)
+            candidates = np.flatnonzero(~weakly_dominated)
+        else:
+            candidates = np.arange(len(fitnesses))
+
+        accepted = sum(self._insert_one(genomes[i], fitnesses[i]) for i in candidates)
+        while len(self.genomes) > self.max_size:
+            self._remove(np.array([np.argmin(crowding_distance(self.fitnesses))]))
+        return accepted
+
+    def _insert_one(self, genome: np.ndarray, fitness: np.ndarray) -> bool:
+        keys = -self.fitnesses[:, 0]
+        # [0:end)는 첫 번째 목적이 fitness 이상인 구성원 (새 점을 지배할 수 있는 쪽)
+        end = np.searchsorted(keys, -fitness[0], side='right')
+        if (self.fitnesses[:end] >= fitness).all(axis=1).any():
+            return False
+
+        # [start:)는 첫 번째 목적이 fitness 이하인 구성원 (새 점이 지배할 수 있는 쪽)
+        start = np.searchsorted(keys, -fitness[0], side='left')
+        dominated = start + np.flatnonzero((self.fitnesses[start:] <= fitness).all(axis=1))
+        if len(dominated) > 0:
+            self._remove(dominated)
+            start = np.searchsorted(-self.fitnesses[:, 0], -fitness[0], side='left')
+
+        is_improved = (fitness > self.initial_fitness).sum() >= 3
+        self.genomes.insert(start, genome.copy())
+        self.fitnesses = np.insert(self.fitnesses, start, fitness, axis=0)
+        self.improved = np.insert(self.improved, start, is_improved)
+        self.improved_count += int(is_improved)
+        return True
+
+    def _remove(self, indices: np.ndarray):
+        self.improved_count -= int(self.improved[indices].sum())
+        for i in sorted(indices.tolist(), reverse=True):
+            del self.genomes[i]
+        self.fitnesses = np.delete(self.fitnesses, indices, axis=0)
+        self.improved = np.delete(self.improved, indices)
+
+    def genome_array(self) -> np.ndarray:
+        return np.stack(self.genomes)
+
+    def merge(self, other: 'ParetoArchive') -> int:
+        if len(other) == 0:
+            return 0
+        return self.insert(other.genome_array(), other.fitnesses)
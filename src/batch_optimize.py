@@ -0,0 +1,168 @@
+import argparse
+import os
+import sys
+import time
+import traceback
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+from Diet_class import Diet, NutrientConstraints
+from load_data import load_all_menus, create_nutrient_constraints, read_diet, get_file_path
+from evaluation_function import EvaluationContext
+from history_stream import load_history_context
+from catalog import MenuCatalog
+from MOO import MultiObjectiveDietOptimizer
+from parallel_fitness import init_worker, worker_data
+from telemetry import TimeLimit
+
+OBJECTIVE_COLUMNS = ['nutrition', 'cost', 'harmony', 'diversity']
+
+def find_diet_files(source: str) -> List[Tuple[str, str]]:
+    # 폴더면 그 안의 xlsx 전부, 파일이면 한 줄에 하나씩 경로를 적은 목록(csv라면 path, site 열)으로 본다.
+    # 목록 안의 상대 경로는 목록 파일 위치 기준이다
+    if os.path.isdir(source):
+        paths = sorted(os.path.join(source, name) for name in os.listdir(source)
+                       if name.endswith('.xlsx') and not name.startswith('~$'))
+        return [(os.path.splitext(os.path.basename(path))[0], path) for path in paths]
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    if source.endswith('.csv'):
+        manifest = pd.read_csv(source)
+        paths = manifest['path'].tolist()
+        sites = manifest['site'].tolist() if 'site' in manifest else [None] * len(paths)
+    else:
+        with open(source, encoding='utf-8') as f:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        sites = [None] * len(paths)
+
+    jobs = []
+    for site, path in zip(sites, paths):
+        path = os.path.join(base_dir, path)
+        jobs.append((site or os.path.splitext(os.path.basename(path))[0], path))
+    return jobs
+
+def front_to_dataframe(front: List[Diet]) -> pd.DataFrame:
+    rows = []
+    for solution, diet in enumerate(front):
+        for meal in diet.meals:
+            rows.append({'solution': solution, 'Day': meal.date, 'MealType': meal.meal_type,
+                         'Menus': ', '.join(menu.name for menu in meal.menus)})
+    return pd.DataFrame(rows, columns=['solution', 'Day', 'MealType', 'Menus'])
+
+def fitness_to_dataframe(initial_fitness: List[float], front_fitnesses: List[List[float]]) -> pd.DataFrame:
+    # 0번 행은 초기 식단, 이후 행은 파레토 프론트의 각 식단
+    fitness_df = pd.DataFrame([initial_fitness] + front_fitnesses, columns=OBJECTIVE_COLUMNS)
+    fitness_df.insert(0, 'solution', ['initial'] + list(range(len(front_fitnesses))))
+    fitness_df['improved_objectives'] = (fitness_df[OBJECTIVE_COLUMNS] > initial_fitness).sum(axis=1)
+    return fitness_df
+
+def optimize_site(site: str, diet_path: str, output_dir: str, generations: int, population_size: int,
+                  timeout: float, seed: int, window_meals: int = 0, step_meals: int = 14) -> Dict:
+    # window_meals가 0보다 크고 식단이 그보다 길면 겹치는 창으로 나눠 차례로 최적화한다 (optimize_rolling)
+    context, catalog, nutrient_constraints = worker_data()
+    start = time.perf_counter()
+    time_limit = TimeLimit(timeout) if timeout else None
+    summary = {'site': site, 'path': diet_path, 'status': 'done', 'front_size': 0, 'improved_diets': 0, 'seconds': 0.0, 'error': ''}
+    try:
+        weekly_diet = read_diet(diet_path, {menu.name: menu for menu in catalog.menus})
+        optimizer = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context, seed=seed)
+        initial_fitness = optimizer.fitness(weekly_diet)
+        observers = [time_limit] if time_limit is not None else None
+        if 0 < window_meals < len(weekly_diet.meals):
+            pareto_front = optimizer.optimize_rolling(weekly_diet, window_meals, min(step_meals, window_meals), window_meals,
+                                                      generations, population_size, observers)
+        else:
+            pareto_front = optimizer.optimize(weekly_diet, generations, population_size, observers=observers)
+        front_fitnesses = [optimizer.fitness(diet) for diet in pareto_front]
+
+        site_dir = os.path.join(output_dir, site)
+        os.makedirs(site_dir, exist_ok=True)
+        front_to_dataframe(pareto_front).to_csv(os.path.join(site_dir, 'pareto_front.csv'), index=False, encoding='utf-8-sig')
+        fitness_df = fitness_to_dataframe(initial_fitness, front_fitnesses)
+        fitness_df.to_csv(os.path.join(site_dir, 'fitness.csv'), index=False, encoding='utf-8-sig')
+
+        summary['front_size'] = len(pareto_front)
+        summary['improved_diets'] = optimizer.count_improved_diets(initial_fitness, front_fitnesses)
+        if time_limit is not None and time_limit.expired:
+            summary['status'] = 'timeout'
+    except Exception as e:
+        summary['status'] = 'failed'
+        summary['error'] = f'{type(e).__name__}: {e}'
+        traceback.print_exc()
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+def run_batch(jobs: List[Tuple[str, str]], output_dir: str, context: EvaluationContext, catalog: MenuCatalog,
+              nutrient_constraints: NutrientConstraints, generations: int, population_size: int,
+              n_workers: int, timeout: float, seed: int, window_meals: int = 0, step_meals: int = 14) -> pd.DataFrame:
+    os.makedirs(output_dir, exist_ok=True)
+    job_args = [(site, path, output_dir, generations, population_size, timeout, seed + i, window_meals, step_meals)
+                for i, (site, path) in enumerate(jobs)]
+    summaries = []
+    if n_workers <= 1:
+        init_worker(context, catalog, nutrient_constraints)
+        for args in job_args:
+            summaries.append(optimize_site(*args))
+            print(f"[{len(summaries)}/{len(jobs)}] {summaries[-1]['site']}: {summaries[-1]['status']} ({summaries[-1]['seconds']:.1f}s)")
+    else:
+        # 카탈로그와 조화 컨텍스트는 워커 초기화 때 한 번만 넘기고, 작업에는 사이트 이름과 경로만 담는다
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker,
+                                 initargs=(context, catalog, nutrient_constraints)) as executor:
+            futures = [executor.submit(optimize_site, *args) for args in job_args]
+            for future in as_completed(futures):
+                summaries.append(future.result())
+                print(f"[{len(summaries)}/{len(jobs)}] {summaries[-1]['site']}: {summaries[-1]['status']} ({summaries[-1]['seconds']:.1f}s)")
+
+    order = {site: i for i, (site, _) in enumerate(jobs)}
+    summary_df = pd.DataFrame(sorted(summaries, key=lambda summary: order[summary['site']]))
+    summary_df.to_csv(os.path.join(output_dir, 'summary.csv'), index=False, encoding='utf-8-sig')
+    return summary_df
+
+def main():
+    parser = argparse.ArgumentParser(description='여러 사업장의 주간 식단을 한 번에 최적화')
+    parser.add_argument('source', help='주간 식단 xlsx 파일이 있는 폴더, 또는 경로 목록 파일(txt 또는 path, site 열의 csv)')
+    parser.add_argument('--output', default='batch_output', help='파레토 프론트와 적합도 표를 저장할 폴더')
+    parser.add_argument('--generations', type=int, default=100)
+    parser.add_argument('--population-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--timeout', type=float, default=0, help='사업장당 최적화 시간 제한(초). 0이면 제한 없음')
+    parser.add_argument('--seed', type=int, default=0, help='사업장별 시드는 seed + 순번')
+    parser.add_argument('--window-meals', type=int, default=0,
+                        help='이보다 긴 식단(여러 주, 한 달)은 이 끼니 수의 창으로 나눠 차례로 최적화한다. 0이면 항상 한 번에 최적화')
+    parser.add_argument('--step-meals', type=int, default=14, help='다음 창으로 넘어갈 때 미는 끼니 수 (창 길이보다 작으면 창이 겹친다)')
+    parser.add_argument('--diet-db', default=get_file_path('DIET_2401.xlsx'), help='조화 점수에 쓰는 과거 식단 DB (xlsx 또는 Day/MealType/Menus 열의 csv)')
+    parser.add_argument('--menu-db', default=get_file_path('Menu_ingredient_nutrient.xlsx'))
+    parser.add_argument('--ingredient-db', default=get_file_path('Ingredient_Price.xlsx'))
+    args = parser.parse_args()
+
+    jobs = find_diet_files(args.source)
+    if not jobs:
+        print(f'No diet workbooks found in {args.source}')
+        sys.exit(1)
+    sites = [site for site, _ in jobs]
+    if len(set(sites)) != len(sites):
+        print('Site names must be unique (they are used as output folder names)')
+        sys.exit(1)
+
+    start = time.perf_counter()
+    menus = load_all_menus(args.menu_db, args.ingredient_db)
+    # 여러 해 치 과거 식단도 Meal 목록을 만들지 않고 한 번 훑어 평가 기준을 만든다
+    context = load_history_context(args.diet_db, {menu.name: menu for menu in menus})
+    catalog = MenuCatalog(menus)
+    nutrient_constraints = create_nutrient_constraints()
+    load_seconds = time.perf_counter() - start
+
+    summary_df = run_batch(jobs, args.output, context, catalog, nutrient_constraints, args.generations,
+                           args.population_size, args.workers, args.timeout, args.seed, args.window_meals, args.step_meals)
+    total_seconds = time.perf_counter() - start
+
+    completed = int((summary_df['status'] != 'failed').sum())
+    print(f"\n{completed}/{len(jobs)} diets optimised in {total_seconds:.1f}s (data loading {load_seconds:.1f}s), "
+          f"{completed / total_seconds * 60:.1f} diets/minute with {args.workers} workers")
+    for status, count in summary_df['status'].value_counts().items():
+        print(f"  {status}: {count}")
+    print(f"Results written to {os.path.abspath(args.output)}")
+    sys.exit(1 if completed < len(jobs) else 0)
+
+if __name__ == '__main__':
+    main()
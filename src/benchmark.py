@@ -0,0 +1,455 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from Diet_class import Ingredient, Menu, Meal, Diet
+from load_data import load_and_process_data, load_all_menus, create_nutrient_constraints, build_menus, get_file_path
+from evaluation_function import (build_evaluation_context, evaluate_population, evaluate_nutrition, evaluate_cost,
+                                 evaluate_harmony, evaluate_diversity, evaluate_nutrition_batch, evaluate_cost_batch,
+                                 evaluate_harmony_batch, evaluate_diversity_batch)
+from catalog import MenuCatalog, NUTRIENT_NAMES
+from MOO import MultiObjectiveDietOptimizer, rolling_windows
+from parallel_fitness import create_fitness_executor, evaluate_population_parallel
+from history_stream import load_history_context, iter_history_meals
+
+def load_default_problem():
+    menu_db_path = get_file_path('Menu_ingredient_nutrient.xlsx')
+    ingre_db_path = get_file_path('Ingredient_Price.xlsx')
+
+    diet_db = load_and_process_data(get_file_path('DIET_2401.xlsx'), menu_db_path, ingre_db_path)
+    weekly_diet = load_and_process_data(get_file_path('Weekly_diet_ex.xlsx'), menu_db_path, ingre_db_path)
+    context = build_evaluation_context(diet_db)
+    catalog = MenuCatalog(load_all_menus(menu_db_path, ingre_db_path))
+
+    return context, catalog, create_nutrient_constraints(), weekly_diet
+
+def time_call(func, repeats: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+def bench_parallel(worker_counts, population_size: int, repeats: int):
+    context, catalog, nutrient_constraints, weekly_diet = load_default_problem()
+    optimizer = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context, seed=0)
+    initial_genome = catalog.encode_diet(weekly_diet)
+    population = np.stack([optimizer.mutate(initial_genome) for _ in range(population_size)])
+    expected = evaluate_population(context, catalog, population, nutrient_constraints)
+
+    print(f"population={population_size}, repeats={repeats}")
+    print(f"{'workers':>8} {'seconds':>10} {'diets/s':>12} {'speedup':>8}")
+    serial_seconds = None
+    for n_workers in worker_counts:
+        if n_workers <= 1:
+            seconds = time_call(lambda: evaluate_population(context, catalog, population, nutrient_constraints), repeats)
+        else:
+            with create_fitness_executor(context, catalog, nutrient_constraints, n_workers) as executor:
+                result = evaluate_population_parallel(executor, population, n_workers)
+                assert np.array_equal(result, expected), "parallel fitness differs from serial fitness"
+                seconds = time_call(lambda: evaluate_population_parallel(executor, population, n_workers), repeats)
+
+        if serial_seconds is None:
+            serial_seconds = seconds
+        print(f"{n_workers:>8} {seconds:>10.4f} {population_size / seconds:>12.0f} {serial_seconds / seconds:>7.2f}x")
+
+def make_synthetic_menu_tables(n_rows: int, n_menus: int, n_ingredients: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    menus = [f'menu_{i}' for i in range(n_menus)]
+    ingredients = [f'ingredient_{i}' for i in range(n_ingredients)]
+
+    menu_ingre_df = pd.DataFrame({
+        'Menu': np.array(menus)[rng.integers(0, n_menus, n_rows)],
+        'Ingredient': np.array(ingredients)[rng.integers(0, n_ingredients, n_rows)],
+        'Amount_g': rng.uniform(1, 500, n_rows).round(1),
+    })
+    menu_nutri_df = pd.DataFrame({'Menu': menus, **{nutrient: rng.uniform(0, 500, n_menus).round() for nutrient in NUTRIENT_NAMES}})
+    menu_cat_df = pd.DataFrame({'Menu': menus, 'Category': rng.choice(['밥', '국', '주찬', '부찬', '김치'], n_menus)})
+    # 가격표의 10%는 비워 두어 가격 없는 재료 경로도 함께 잰다
+    priced = ingredients[:int(n_ingredients * 0.9)]
+    ingre_price_df = pd.DataFrame({'Ingredient': priced, 'Price': rng.integers(100, 10000, len(priced))})
+
+    return menu_ingre_df, menu_nutri_df, menu_cat_df, ingre_price_df
+
+def price_ingredients_per_row(menu_ingre_df: pd.DataFrame, ingre_price_df: pd.DataFrame) -> list:
+    # 이전 load_data의 행 단위 가격 조회 방식 (비교 기준)
+    prices = []
+    for _, row in menu_ingre_df.iterrows():
+        price_per_100g = ingre_price_df[ingre_price_df['Ingredient'] == row['Ingredient']]['Price']
+        prices.append((price_per_100g.values[0] / 100) * row['Amount_g'] if not price_per_100g.empty else 0)
+    return prices
+
+def bench_catalog(n_rows: int, n_menus: int, n_ingredients: int, legacy_rows: int, n_price_changes: int):
+    tables = make_synthetic_menu_tables(n_rows, n_menus, n_ingredients)
+    menu_ingre_df, _, _, ingre_price_df = tables
+
+    start = time.perf_counter()
+    menus = build_menus(*tables)
+    vectorized_seconds = time.perf_counter() - start
+
+    # 행 단위 방식은 너무 느리므로 일부 행만 재서 전체 시간을 추정한다
+    sample = menu_ingre_df.head(legacy_rows)
+    start = time.perf_counter()
+    price_ingredients_per_row(sample, ingre_price_df)
+    legacy_seconds = (time.perf_counter() - start) * n_rows / len(sample)
+
+    print(f"rows={n_rows}, menus={len(menus)}, ingredients={n_ingredients}")
+    print(f"vectorized build_menus: {vectorized_seconds:.3f}s")
+    print(f"per-row price lookup (estimated from {len(sample)} rows): {legacy_seconds:.1f}s")
+    print(f"speedup: {legacy_seconds / vectorized_seconds:.0f}x")
+
+    # 가격표 일부가 바뀌었을 때 카탈로그를 다시 만드는 대신 역색인으로 바뀐 메뉴만 고친다
+    rng = np.random.default_rng(1)
+    changed_ingredients = rng.choice(ingre_price_df['Ingredient'], n_price_changes, replace=False)
+    new_prices = dict(zip(changed_ingredients.tolist(), rng.integers(100, 10000, n_price_changes).astype(float).tolist()))
+    start = time.perf_counter()
+    catalog = MenuCatalog(menus)
+    catalog_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    changed = catalog.reprice(new_prices)
+    reprice_seconds = time.perf_counter() - start
+    print(f"reprice {n_price_changes} ingredients: {len(changed)} menus re-costed in {reprice_seconds * 1000:.1f}ms "
+          f"(rebuild: build_menus {vectorized_seconds:.3f}s + MenuCatalog {catalog_seconds:.3f}s)")
+
+def write_synthetic_history(path: str, n_rows: int, menu_names: List[str], seed: int = 0, chunk_rows: int = 100000):
+    # 인기 메뉴가 자주 나오도록 순위의 역수에 비례해 뽑은 4~7개 메뉴로 과거 식단 CSV를 조금씩 나눠 쓴다
+    rng = np.random.default_rng(seed)
+    weights = 1 / (np.arange(len(menu_names)) + 10)
+    weights /= weights.sum()
+    names = np.array(menu_names, dtype=object)
+    for start in range(0, n_rows, chunk_rows):
+        n = min(chunk_rows, n_rows - start)
+        sizes = rng.integers(4, 8, n)
+        picks = names[rng.choice(len(names), sizes.sum(), p=weights)]
+        menus = [', '.join(meal) for meal in np.split(picks, np.cumsum(sizes)[:-1])]
+        day = np.arange(start, start + n) // len(MEAL_TYPES) + 1
+        pd.DataFrame({'Day': day, 'MealType': np.array(MEAL_TYPES)[np.arange(start, start + n) % len(MEAL_TYPES)], 'Menus': menus}) \
+            .to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+def measure(func):
+    # (결과, 걸린 시간, tracemalloc 최대 사용량) — 시간은 추적 없이 한 번, 최대 메모리는 추적하며 한 번 더 잰다
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def bench_history(n_rows: int, n_menus: int, chunk_rows: int, legacy_rows: int):
+    menu_objects = {f'menu_{i}': Menu(f'menu_{i}', [0] * len(NUTRIENT_NAMES), [Ingredient('ingredient', float(100 + i % 900), 100)], '부찬')
+                    for i in range(n_menus)}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.csv')
+        write_synthetic_history(path, n_rows, list(menu_objects))
+        print(f"rows={n_rows}, menus={n_menus}, file={os.path.getsize(path) / 2**20:.0f} MiB")
+
+        context, seconds, peak = measure(lambda: load_history_context(path, menu_objects, chunk_rows))
+        print(f"streaming: {seconds:.1f}s, {n_rows / seconds:,.0f} rows/s, peak {peak / 2**20:.0f} MiB, "
+              f"{context.harmony_matrix.nnz:,} distinct pairs")
+
+        # 전체 Meal 목록을 만든 뒤 평가 기준을 만드는 기존 방식은 앞부분만 재서 비교한다
+        legacy_path = os.path.join(directory, 'legacy.csv')
+        pd.read_csv(path, nrows=legacy_rows).to_csv(legacy_path, index=False)
+        _, seconds, peak = measure(lambda: build_evaluation_context(Diet(list(iter_history_meals(legacy_path, menu_objects)))))
+        _, stream_seconds, stream_peak = measure(lambda: load_history_context(legacy_path, menu_objects, chunk_rows))
+        print(f"first {legacy_rows} rows: materialized {legacy_rows / seconds:,.0f} rows/s, peak {peak / 2**20:.0f} MiB; "
+              f"streaming {legacy_rows / stream_seconds:,.0f} rows/s, peak {stream_peak / 2**20:.0f} MiB")
+
+MEAL_SLOTS = ['밥', '국', '주찬', '부찬', '부찬', '김치']
+MEAL_TYPES = ['Breakfast', 'Lunch', 'Dinner']
+
+def make_synthetic_problem(n_menus: int, meals_per_week: int = 21, weeks_of_history: int = 52, seed: int = 0):
+    # 카테고리 구성(밥/국/주찬/부찬/김치)을 실제 식단과 비슷하게 맞춘 합성 카탈로그와 과거 식단
+    rng = np.random.default_rng(seed)
+    categories = sorted(set(MEAL_SLOTS))
+    category_shares = np.array([0.05, 0.25, 0.5, 0.15, 0.05])  # 국, 김치, 부찬, 주찬, 밥 (정렬 순서)
+
+    menus = []
+    for i in range(n_menus):
+        category = categories[rng.choice(len(categories), p=category_shares)]
+        nutrients = dict(zip(NUTRIENT_NAMES, rng.uniform([20, 2, 1, 0, 5], [400, 70, 30, 25, 200]).round()))
+        ingredients = [Ingredient(f'ingredient_{j}', float(rng.uniform(50, 1500)), float(rng.uniform(5, 200)))
+                       for j in rng.integers(0, max(n_menus // 2, 1), rng.integers(1, 6))]
+        menus.append(Menu(f'menu_{i}', nutrients, ingredients, category))
+
+    by_category = {category: [menu for menu in menus if menu.category == category] for category in categories}
+    def random_meals(n_meals: int):
+        meals = []
+        for i in range(n_meals):
+            meal_menus = [by_category[category][rng.integers(len(by_category[category]))]
+                          for category in MEAL_SLOTS if by_category[category]]
+            meals.append(Meal(meal_menus, str(i // len(MEAL_TYPES) + 1), MEAL_TYPES[i % len(MEAL_TYPES)]))
+        return meals
+
+    diet_db = Diet(random_meals(meals_per_week * weeks_of_history))
+    initial_diet = Diet(random_meals(meals_per_week))
+    return build_evaluation_context(diet_db), MenuCatalog(menus), create_nutrient_constraints(), initial_diet, diet_db
+
+def best_time(func, repeats: int, min_sample_seconds: float = 0.02) -> float:
+    # 짧은 함수는 한 표본이 min_sample_seconds 이상이 되도록 반복 횟수를 늘려 잡음을 줄인다
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_sample_seconds:
+            break
+        loops *= 2
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        times.append((time.perf_counter() - start) / loops)
+    return min(times)
+
+def run_suite(n_menus: int, meals_per_week: int, weeks_of_history: int, populations, generations, repeats: int) -> Dict[str, float]:
+    context, catalog, nutrient_constraints, initial_diet, _ = make_synthetic_problem(n_menus, meals_per_week, weeks_of_history)
+    optimizer = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context, seed=0, cache_size=0)
+    initial_genome = catalog.encode_diet(initial_diet)
+    results = {}
+
+    results['evaluate_nutrition'] = best_time(lambda: evaluate_nutrition(initial_diet, nutrient_constraints), repeats)
+    results['evaluate_cost'] = best_time(lambda: evaluate_cost(context, initial_diet), repeats)
+    results['evaluate_harmony'] = best_time(lambda: evaluate_harmony(context, initial_diet), repeats)
+    results['evaluate_diversity'] = best_time(lambda: evaluate_diversity(initial_diet), repeats)
+
+    for population_size in populations:
+        population = np.stack([optimizer.mutate(initial_genome) for _ in range(population_size)])
+        fitnesses = evaluate_population(context, catalog, population, nutrient_constraints)
+        results[f'evaluate_nutrition_batch[p={population_size}]'] = best_time(lambda: evaluate_nutrition_batch(catalog, population, nutrient_constraints), repeats)
+        results[f'evaluate_cost_batch[p={population_size}]'] = best_time(lambda: evaluate_cost_batch(context, catalog, population), repeats)
+        results[f'evaluate_harmony_batch[p={population_size}]'] = best_time(lambda: evaluate_harmony_batch(context, catalog, population), repeats)
+        results[f'evaluate_diversity_batch[p={population_size}]'] = best_time(lambda: evaluate_diversity_batch(population), repeats)
+        results[f'non_dominated_sort[p={population_size}]'] = best_time(lambda: optimizer.non_dominated_sort(population, fitnesses), repeats)
+        results[f'crowding_distance[p={population_size}]'] = best_time(lambda: optimizer.crowding_distance(fitnesses), repeats)
+
+    results['crossover'] = best_time(lambda: optimizer.crossover(initial_genome, population[0]), repeats)
+    results['mutate'] = best_time(lambda: optimizer.mutate(initial_genome), repeats)
+
+    for population_size in populations:
+        for n_generations in generations:
+            def run():
+                # 종료 조건을 끄고 항상 지정한 세대 수만큼 돌려 실행 간 작업량을 같게 만든다
+                fixed = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context, seed=0, target_improved_diets=None)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fixed.optimize(initial_diet, n_generations, population_size)
+            results[f'optimize[p={population_size},g={n_generations}]'] = best_time(run, max(1, repeats // 5), min_sample_seconds=0)
+
+    return results
+
+def get_git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+def compare_results(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> list:
+    regressions = []
+    print(f"{'benchmark':<45} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name] if baseline[name] > 0 else float('inf')
+        flag = ' REGRESSION' if ratio > 1 + threshold else ''
+        print(f"{name:<45} {baseline[name]:>10.5f} {seconds:>10.5f} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def bench_suite(args) -> int:
+    results = run_suite(args.menus, args.meals_per_week, args.weeks, args.populations, args.generations, args.repeats)
+    report = {
+        'commit': get_git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'params': {
+            'menus': args.menus, 'meals_per_week': args.meals_per_week, 'weeks': args.weeks,
+            'populations': args.populations, 'generations': args.generations, 'repeats': args.repeats,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('params') != report['params']:
+            print("warning: baseline was recorded with different parameters")
+        regressions = compare_results(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+            return 1
+    else:
+        for name, seconds in results.items():
+            print(f"{name:<45} {seconds:>10.5f}s")
+    return 0
+
+def run_until_termination(problem, seeds: int, generations: int, population_size: int, **optimizer_options) -> Dict[str, float]:
+    # 시드마다 종료 조건이나 세대 수 상한까지 돌려 종료 비율, 세대 수, 시간, 개선 식단 수의 평균을 낸다
+    context, catalog, nutrient_constraints, initial_diet = problem
+    initial_genome = catalog.encode_diet(initial_diet)
+    terminated, generations_run, seconds, improved = [], [], [], []
+    for seed in range(seeds):
+        optimizer = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context, seed=seed, **optimizer_options)
+        start = time.perf_counter()
+        initial_fitness = optimizer.fitness(initial_diet)
+        state = optimizer.initial_population(initial_genome, initial_fitness, population_size)
+        reason = optimizer.evolve(state, generations)
+        seconds.append(time.perf_counter() - start)
+        terminated.append(reason == 'improved')
+        generations_run.append(state.generation)
+        improved.append(state.archive.improved_count)
+    return {'terminated': np.mean(terminated), 'generations': np.mean(generations_run),
+            'seconds': np.mean(seconds), 'improved': np.mean(improved)}
+
+def load_operator_problem(menus: int):
+    if menus:
+        context, catalog, nutrient_constraints, initial_diet, _ = make_synthetic_problem(menus)
+        return context, catalog, nutrient_constraints, initial_diet
+    return load_default_problem()
+
+def print_termination_table(label: str, values: List, results: List[Dict[str, float]]):
+    print(f"{label:>8} {'terminated':>11} {'generations':>12} {'seconds':>9} {'improved':>9}")
+    for value, result in zip(values, results):
+        print(f"{value:>8} {result['terminated']:>11.0%} {result['generations']:>12.1f} {result['seconds']:>9.3f} {result['improved']:>9.1f}")
+
+def bench_memetic(args):
+    # 같은 시드들로 지역 탐색 예산만 바꿔 가며 종료 조건까지 걸린 세대 수와 시간을 비교한다
+    problem = load_operator_problem(args.menus)
+    budgets = [0] + args.budgets
+    results = [run_until_termination(problem, args.seeds, args.generations, args.population,
+                                     target_improved_diets=args.target, local_search_budget=budget) for budget in budgets]
+    print_termination_table('budget', budgets, results)
+
+def bench_repair(args):
+    # 같은 시드들로 영양 보정 비율만 바꿔 가며 비교한다
+    problem = load_operator_problem(args.menus)
+    rates = [0.0] + args.rates
+    results = [run_until_termination(problem, args.seeds, args.generations, args.population,
+                                     target_improved_diets=args.target, repair_rate=rate) for rate in rates]
+    print_termination_table('rate', rates, results)
+
+def repeat_weeks(weekly_diet: Diet, weeks: int) -> Diet:
+    # 1주 식단을 weeks번 이어 붙인 긴 식단. 날짜는 주마다 구분되게 바꾼다
+    return Diet([Meal(meal.menus, f'{week + 1}-{meal.date}', meal.meal_type) for week in range(weeks) for meal in weekly_diet.meals])
+
+def bench_horizon(args):
+    # 식단 길이(주)에 따라 전체 평가 시간, 한 번에 최적화한 시간과 창별(rolling horizon) 최적화 시간을 비교한다.
+    # 두 방식 모두 종료 조건 없이 세대 수를 채우며(창별은 창마다), 점수는 결과 식단 전체를 다시 평가한 목적별 최댓값이다
+    context, catalog, nutrient_constraints, weekly_diet = load_operator_problem(args.menus)
+    print(f"{'weeks':>5} {'meals':>6} {'eval_ms':>8} {'windows':>8} {'full_s':>8} {'rolling_s':>10}  {'best (full)':<30} {'best (rolling)':<30}")
+    for weeks in args.weeks:
+        diet = repeat_weeks(weekly_diet, weeks)
+        population = np.repeat(catalog.encode_diet(diet)[np.newaxis], args.population, axis=0)
+        eval_seconds = best_time(lambda: evaluate_population(context, catalog, population, nutrient_constraints), 3)
+        windows = rolling_windows(len(diet.meals), args.window_meals, args.step_meals, args.window_meals)
+
+        results = []
+        for rolling in (False, True):
+            optimizer = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context, seed=0, target_improved_diets=None)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if rolling:
+                    front = optimizer.optimize_rolling(diet, args.window_meals, args.step_meals, args.window_meals,
+                                                       args.generations, args.population)
+                else:
+                    front = optimizer.optimize(diet, args.generations, args.population)
+            seconds = time.perf_counter() - start
+            best = np.array([optimizer.fitness(solution) for solution in front]).max(axis=0)
+            results.append((seconds, ' '.join(f'{value:.1f}' for value in best)))
+        print(f"{weeks:>5} {len(diet.meals):>6} {eval_seconds * 1e3:>8.1f} {len(windows):>8} {results[0][0]:>8.2f} {results[1][0]:>10.2f}"
+              f"  {results[0][1]:<30} {results[1][1]:<30}")
+
+def main():
+    parser = argparse.ArgumentParser(description='식단 최적화 벤치마크')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parallel_parser = subparsers.add_parser('parallel', help='워커 수에 따른 병렬 적합도 평가 속도')
+    parallel_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parallel_parser.add_argument('--population', type=int, default=2000)
+    parallel_parser.add_argument('--repeats', type=int, default=5)
+
+    catalog_parser = subparsers.add_parser('catalog', help='합성 레시피 표로 메뉴 카탈로그 생성 속도')
+    catalog_parser.add_argument('--rows', type=int, default=100000)
+    catalog_parser.add_argument('--menus', type=int, default=10000)
+    catalog_parser.add_argument('--ingredients', type=int, default=5000)
+    catalog_parser.add_argument('--legacy-rows', type=int, default=2000)
+    catalog_parser.add_argument('--price-changes', type=int, default=3000, help='reprice로 바꿀 재료 가격 수')
+
+    suite_parser = subparsers.add_parser('suite', help='평가 함수, 선택, 변이 연산과 전체 최적화 시간 측정')
+    suite_parser.add_argument('--menus', type=int, default=3000)
+    suite_parser.add_argument('--meals-per-week', type=int, default=21)
+    suite_parser.add_argument('--weeks', type=int, default=52, help='과거 식단 DB의 주 수')
+    suite_parser.add_argument('--populations', type=int, nargs='+', default=[50, 200])
+    suite_parser.add_argument('--generations', type=int, nargs='+', default=[20])
+    suite_parser.add_argument('--repeats', type=int, default=10)
+    suite_parser.add_argument('--output', help='결과를 저장할 JSON 경로')
+    suite_parser.add_argument('--compare', help='비교할 이전 결과 JSON 경로')
+    suite_parser.add_argument('--threshold', type=float, default=0.2, help='이 비율 이상 느려지면 실패로 처리')
+
+    memetic_parser = subparsers.add_parser('memetic', help='지역 탐색 예산에 따른 종료까지의 세대 수와 시간')
+    memetic_parser.add_argument('--budgets', type=int, nargs='+', default=[50, 200])
+    memetic_parser.add_argument('--seeds', type=int, default=10)
+    memetic_parser.add_argument('--generations', type=int, default=100)
+    memetic_parser.add_argument('--population', type=int, default=50)
+    memetic_parser.add_argument('--target', type=int, default=5, help='종료 조건의 개선 식단 수')
+    memetic_parser.add_argument('--menus', type=int, default=0, help='0이면 data 폴더의 실제 데이터, 아니면 이 크기의 합성 문제')
+
+    repair_parser = subparsers.add_parser('repair', help='영양 보정 비율에 따른 종료까지의 세대 수와 시간')
+    repair_parser.add_argument('--rates', type=float, nargs='+', default=[0.25, 0.5, 1.0])
+    repair_parser.add_argument('--seeds', type=int, default=10)
+    repair_parser.add_argument('--generations', type=int, default=100)
+    repair_parser.add_argument('--population', type=int, default=50)
+    repair_parser.add_argument('--target', type=int, default=5, help='종료 조건의 개선 식단 수')
+    repair_parser.add_argument('--menus', type=int, default=0, help='0이면 data 폴더의 실제 데이터, 아니면 이 크기의 합성 문제')
+
+    history_parser = subparsers.add_parser('history', help='합성 과거 식단 CSV를 스트리밍으로 읽는 속도와 최대 메모리')
+    history_parser.add_argument('--rows', type=int, default=2000000)
+    history_parser.add_argument('--menus', type=int, default=5000)
+    history_parser.add_argument('--chunk-rows', type=int, default=50000)
+    history_parser.add_argument('--legacy-rows', type=int, default=200000, help='Meal 목록을 만드는 기존 방식과 비교할 행 수')
+
+    horizon_parser = subparsers.add_parser('horizon', help='식단 길이(주)에 따른 한 번에 최적화와 창별 최적화 시간 비교')
+    horizon_parser.add_argument('--weeks', type=int, nargs='+', default=[1, 2, 4, 8])
+    horizon_parser.add_argument('--generations', type=int, default=20, help='한 번에 최적화의 세대 수, 창별 최적화는 창마다 이만큼')
+    horizon_parser.add_argument('--population', type=int, default=50)
+    horizon_parser.add_argument('--window-meals', type=int, default=21)
+    horizon_parser.add_argument('--step-meals', type=int, default=14)
+    horizon_parser.add_argument('--menus', type=int, default=0, help='0이면 data 폴더의 실제 데이터, 아니면 이 크기의 합성 문제')
+
+    args = parser.parse_args()
+    if args.command == 'suite':
+        sys.exit(bench_suite(args))
+    elif args.command == 'parallel':
+        bench_parallel(args.workers, args.population, args.repeats)
+    elif args.command == 'catalog':
+        bench_catalog(args.rows, args.menus, args.ingredients, args.legacy_rows, args.price_changes)
+    elif args.command == 'memetic':
+        bench_memetic(args)
+    elif args.command == 'repair':
+        bench_repair(args)
+    elif args.command == 'history':
+        bench_history(args.rows, args.menus, args.chunk_rows, args.legacy_rows)
+    elif args.command == 'horizon':
+        bench_horizon(args)
+
+if __name__ == '__main__':
+    main()
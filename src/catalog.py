@@ -0,0 +1,179 @@
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Tuple
+from Diet_class import Ingredient, Menu, Meal, Diet, NUTRIENT_NAMES
+
+# history_index가 기억하는 과거 식단(조화 행렬 메뉴 순서)의 수
+MAX_HISTORY_INDEXES = 4
+
+class MenuCatalog:
+    def __init__(self, menus: List[Menu]):
+        self._menus = list(menus)  # reprice가 바뀐 메뉴를 새 객체로 갈아 끼우므로 넘겨받은 리스트와 분리한다
+        self._stale_menus = set()
+        self.names = [menu.name for menu in menus]
+        self.name_to_index = {name: i for i, name in enumerate(self.names)}
+        self.category_names = sorted(set(menu.category for menu in menus))
+        category_to_code = {category: i for i, category in enumerate(self.category_names)}
+
+        # 빈 슬롯(-1)이 마지막 행을 참조하므로 모든 배열 끝에 0(또는 -1) 행을 하나 더 둔다
+        n_menus = len(menus)
+        self.nutrients = np.zeros((n_menus + 1, len(NUTRIENT_NAMES)))
+        if n_menus:
+            self.nutrients[:n_menus] = np.stack([menu.nutrients for menu in menus])
+        self.costs = np.zeros(n_menus + 1)
+        self.categories = np.full(n_menus + 1, -1, dtype=np.int32)
+        for i, menu in enumerate(menus):
+            self.costs[i] = sum(ingredient.price for ingredient in menu.ingredients)
+            self.categories[i] = category_to_code[menu.category]
+
+        # 카테고리별 후보 풀: category_members[category_starts[c]:category_starts[c+1]]가 카테고리 c의 메뉴들
+        self.category_members = np.argsort(self.categories[:n_menus], kind='stable').astype(np.int32)
+        category_sizes = np.bincount(self.categories[:n_menus], minlength=len(self.category_names))
+        self.category_starts = np.concatenate(([0], np.cumsum(category_sizes)))
+
+        # 메뉴별 재료 항목: entry_*[menu_entry_starts[i]:menu_entry_starts[i+1]]가 메뉴 i의 재료들 (Menu.ingredients 순서)
+        n_entries = [len(menu.ingredients) for menu in menus]
+        self.menu_entry_starts = np.concatenate(([0], np.cumsum(n_entries))).astype(np.int64)
+        entries = [ingredient for menu in menus for ingredient in menu.ingredients]
+        self.entry_menus = np.repeat(np.arange(n_menus), n_entries)
+        self.entry_grams = np.array([ingredient.amount_g for ingredient in entries], dtype=float)
+        self.entry_prices = np.array([ingredient.price for ingredient in entries], dtype=float)
+        # 재료 -> (메뉴, g) 역색인: ingredient_entries[ingredient_starts[k]:ingredient_starts[k+1]]가 재료 k가 들어간 항목들
+        self.ingredient_names = sorted(set(ingredient.name for ingredient in entries))
+        self.ingredient_to_index = {name: k for k, name in enumerate(self.ingredient_names)}
+        entry_ingredients = np.array([self.ingredient_to_index[ingredient.name] for ingredient in entries], dtype=np.int64)
+        self.ingredient_entries = np.argsort(entry_ingredients, kind='stable')
+        self.ingredient_starts = np.concatenate(([0], np.cumsum(np.bincount(entry_ingredients, minlength=len(self.ingredient_names))))).astype(np.int64)
+
+        # id(menu_to_index) -> (menu_to_index, 색인). 매핑을 함께 들고 있어 id가 다른 객체에 다시 쓰이지 않는다
+        self._history_index: 'OrderedDict[int, Tuple[Dict[str, int], np.ndarray]]' = OrderedDict()
+        self._nearest: Dict[int, np.ndarray] = {}
+
+    @property
+    def menus(self) -> List[Menu]:
+        # reprice는 비용 배열만 바로 고치고, 재료 가격이 바뀐 Menu 객체는 처음 꺼낼 때 새로 만든다
+        if self._stale_menus:
+            for menu in self._stale_menus:
+                old = self._menus[menu]
+                prices = self.entry_prices[self.menu_entry_starts[menu]:self.menu_entry_starts[menu + 1]].tolist()
+                ingredients = [Ingredient(ingredient.name, price, ingredient.amount_g) for ingredient, price in zip(old.ingredients, prices)]
+                self._menus[menu] = Menu(old.name, old.nutrients, ingredients, old.category)
+            self._stale_menus.clear()
+        return self._menus
+
+    def __len__(self) -> int:
+        return len(self._menus)
+
+    def history_index(self, context) -> np.ndarray:
+        # 카탈로그 인덱스 -> 조화 행렬 인덱스 (과거 식단에 없던 메뉴와 빈 슬롯은 -1).
+        # 비용 범위만 바꾼 컨텍스트(dataclasses.replace)도 같은 menu_to_index를 쓰므로 매핑 객체 기준으로 기억하고,
+        # 오래 도는 프로세스에서 쌓이지 않게 최근 MAX_HISTORY_INDEXES개만 남긴다
+        menu_to_index = context.menu_to_index
+        cached = self._history_index.get(id(menu_to_index))
+        if cached is not None and cached[0] is menu_to_index:
+            self._history_index.move_to_end(id(menu_to_index))
+            return cached[1]
+
+        index = np.full(len(self.menus) + 1, -1, dtype=np.int64)
+        for i, name in enumerate(self.names):
+            index[i] = menu_to_index.get(name, -1)
+        self._history_index[id(menu_to_index)] = (menu_to_index, index)
+        while len(self._history_index) > MAX_HISTORY_INDEXES:
+            self._history_index.popitem(last=False)
+        return index
+
+    def reprice(self, prices_per_100g: Dict[str, float]) -> np.ndarray:
+        # 재료명 -> 100g당 가격. 그 재료가 들어간 메뉴의 비용만 다시 계산하고 바뀐 메뉴 인덱스를 돌려준다.
+        # 가격 계산은 load_data.price_ingredients와 같고 (100g당 가격 / 100 * g), 카탈로그에 없는 재료는 무시한다
+        updates = [(self.ingredient_to_index[name], price) for name, price in prices_per_100g.items() if name in self.ingredient_to_index]
+        if not updates:
+            return np.zeros(0, dtype=np.int64)
+        ingredients = np.array([ingredient for ingredient, _ in updates], dtype=np.int64)
+        new_prices = np.array([price for _, price in updates], dtype=float)
+
+        starts, ends = self.ingredient_starts[ingredients], self.ingredient_starts[ingredients + 1]
+        lengths = ends - starts
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        entries = self.ingredient_entries[np.repeat(starts, lengths) + offsets]
+        self.entry_prices[entries] = np.repeat(new_prices, lengths) / 100 * self.entry_grams[entries]
+
+        # 바뀐 메뉴들의 재료 가격을 (메뉴 x 재료 순번) 행렬로 펼쳐 열 순서대로 더한다.
+        # 처음 만들 때의 sum(ingredient.price ...)과 더하는 순서가 같아 다시 읽어 만든 카탈로그와 비트 단위로 같은 비용이 나온다
+        changed = np.unique(self.entry_menus[entries])
+        starts = self.menu_entry_starts[changed]
+        counts = self.menu_entry_starts[changed + 1] - starts
+        positions = starts[:, np.newaxis] + np.arange(counts.max())
+        prices = np.where(positions < (starts + counts)[:, np.newaxis], self.entry_prices[np.minimum(positions, len(self.entry_prices) - 1)], 0.0)
+        costs = np.zeros(len(changed))
+        for column in prices.T:
+            costs += column
+        self.costs[changed] = costs
+        self._stale_menus.update(changed.tolist())
+        return changed
+
+    def sample_same_category(self, menus: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        categories = self.categories[menus]
+        starts = self.category_starts[categories]
+        sizes = self.category_starts[categories + 1] - starts
+        return self.category_members[starts + (rng.random(len(menus)) * sizes).astype(np.int64)]
+
+    def nearest_menus(self, k: int) -> np.ndarray:
+        # 같은 카테고리 안에서 표준화한 영양소 공간의 최근접 k개 메뉴 (후보가 부족하면 -1)
+        if k not in self._nearest:
+            n_menus = len(self.menus)
+            nutrients = self.nutrients[:n_menus]
+            scale = nutrients.std(axis=0)
+            scaled = (nutrients - nutrients.mean(axis=0)) / np.where(scale > 0, scale, 1)
+
+            nearest = np.full((n_menus + 1, k), -1, dtype=np.int32)
+            for category in range(len(self.category_names)):
+                members = self.category_members[self.category_starts[category]:self.category_starts[category + 1]]
+                n_neighbours = min(k, len(members) - 1)
+                if n_neighbours <= 0:
+                    continue
+                points = scaled[members]
+                for start in range(0, len(members), 512):
+                    block = members[start:start+512]
+                    distances = ((scaled[block, np.newaxis, :] - points) ** 2).sum(axis=2)
+                    distances[np.arange(len(block)), np.arange(start, start + len(block))] = np.inf
+                    candidates = np.argpartition(distances, n_neighbours - 1, axis=1)[:, :n_neighbours]
+                    order = np.argsort(np.take_along_axis(distances, candidates, axis=1), axis=1, kind='stable')
+                    nearest[block, :n_neighbours] = members[np.take_along_axis(candidates, order, axis=1)]
+            self._nearest[k] = nearest
+        return self._nearest[k]
+
+    def sample_nearest(self, menus: np.ndarray, rng: np.random.Generator, k: int = 10) -> np.ndarray:
+        neighbours = self.nearest_menus(k)[menus]
+        n_valid = (neighbours >= 0).sum(axis=1)
+        choices = (rng.random(len(menus)) * n_valid).astype(np.int64)
+        sampled = neighbours[np.arange(len(menus)), np.minimum(choices, k - 1)]
+        return np.where(n_valid > 0, sampled, menus)
+
+    def encode_diet(self, diet: Diet, n_slots: int = None) -> np.ndarray:
+        if n_slots is None:
+            n_slots = max((len(meal.menus) for meal in diet.meals), default=0)
+        genome = np.full((len(diet.meals), n_slots), -1, dtype=np.int32)
+        for i, meal in enumerate(diet.meals):
+            for j, menu in enumerate(meal.menus):
+                genome[i, j] = self.name_to_index[menu.name]
+        return genome
+
+    def decode_genome(self, genome: np.ndarray, template: Diet, shared_meals: Dict = None) -> Diet:
+        # shared_meals는 (끼니 위치, 게놈 행) -> Meal. 같은 딕셔너리로 여러 게놈을 풀면 같은 끼니는 한 객체를 함께 쓴다
+        if shared_meals is None:
+            shared_meals = {}
+        menus = self.menus
+        meals = []
+        for i, (row, meal) in enumerate(zip(genome, template.meals)):
+            key = (i, row.tobytes())
+            if key not in shared_meals:
+                shared_meals[key] = Meal([menus[index] for index in row if index >= 0], meal.date, meal.meal_type)
+            meals.append(shared_meals[key])
+        return Diet(meals)
+
+    def decode_genomes(self, genomes: List[np.ndarray], template: Diet, template_genome: np.ndarray = None) -> List[Diet]:
+        # 최적화 결과는 초기 식단과 대부분의 끼니가 같으므로, 초기 식단의 Meal을 그대로 쓰고 달라진 끼니만 새로 만든다
+        shared_meals = {}
+        if template_genome is not None:
+            shared_meals = {(i, row.tobytes()): meal for i, (row, meal) in enumerate(zip(np.asarray(template_genome, dtype=np.int32), template.meals))}
+        return [self.decode_genome(np.asarray(genome, dtype=np.int32), template, shared_meals) for genome in genomes]
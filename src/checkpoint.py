@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import numpy as np
+from typing import Dict
+from archive import ParetoArchive
+
+# 저장하는 배열 구성이 바뀌면 올려서 이전 체크포인트로 이어 달리지 않게 한다
+CHECKPOINT_VERSION = 2
+
+def fingerprint(*arrays) -> str:
+    # 배열들의 dtype·모양·내용을 이어 붙인 sha256. 체크포인트를 만들 때와 같은 평가 데이터인지 확인하는 데 쓴다
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(repr((array.dtype.str, array.shape)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def save_checkpoint(path: str, population: np.ndarray, fitnesses: np.ndarray, generation: int, archive: ParetoArchive,
+                    rng_state: Dict, initial_genome: np.ndarray, config: Dict = None):
+    # Diet 객체 대신 게놈·적합도 배열과 난수 상태(JSON)만 압축된 npz 하나에 담는다.
+    # config는 결과에 영향을 주는 최적화 설정으로, 이어 달릴 때 같은 설정인지 확인하는 데 쓴다
+    archive_genomes = archive.genome_array() if len(archive) else np.empty((0,) + initial_genome.shape, dtype=initial_genome.dtype)
+    arrays = {
+        'version': np.int64(CHECKPOINT_VERSION),
+        'generation': np.int64(generation),
+        'population': population,
+        'fitnesses': fitnesses,
+        'archive_genomes': archive_genomes,
+        'archive_fitnesses': archive.fitnesses,
+        'archive_max_size': np.int64(archive.max_size),
+        'initial_genome': initial_genome,
+        'rng_state': np.array(json.dumps(rng_state)),
+        'config': np.array(json.dumps(config or {}, sort_keys=True)),
+    }
+
+    # 저장 도중 프로세스가 죽어도 이전 체크포인트가 남도록 임시 파일에 쓴 뒤 바꿔 끼운다
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(temp_path, path)
+
+def load_checkpoint(path: str, initial_fitness, config: Dict = None) -> Dict:
+    # config를 주면 저장할 때의 설정과 다를 때 ValueError를 낸다. 다른 설정으로 이어 달리면 끊기지 않은 실행과 결과가 달라진다
+    with np.load(path) as data:
+        if int(data['version']) != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {int(data['version'])} in {path}")
+        saved_config = json.loads(str(data['config']))
+        if config is not None:
+            # JSON을 거치며 튜플은 리스트가 되므로 같은 방식으로 바꿔 비교한다
+            config = json.loads(json.dumps(config))
+            mismatched = sorted(key for key in set(config) | set(saved_config) if config.get(key) != saved_config.get(key))
+            if mismatched:
+                details = ', '.join(f'{key}: saved {saved_config.get(key)!r}, current {config.get(key)!r}' for key in mismatched)
+                raise ValueError(f"Checkpoint {path} was written with different optimizer settings or evaluation data ({details})")
+        archive = ParetoArchive.from_arrays(initial_fitness, int(data['archive_max_size']),
+                                            data['archive_genomes'], data['archive_fitnesses'])
+        return {
+            'generation': int(data['generation']),
+            'population': data['population'],
+            'fitnesses': data['fitnesses'],
+            'archive': archive,
+            'rng_state': json.loads(str(data['rng_state'])),
+            'initial_genome': data['initial_genome'],
+            'config': saved_config,
+        }
@@ -0,0 +1,42 @@
+import os
+import pickle
+from typing import Callable, List, TypeVar
+
+T = TypeVar('T')
+
+# 캐시에 저장되는 객체 구조가 바뀌면 올려서 이전 캐시를 무효화한다
+CACHE_VERSION = 2
+
+def source_signature(source_paths: List[str]) -> tuple:
+    signature = []
+    for path in source_paths:
+        stat = os.stat(path)
+        signature.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+    return (CACHE_VERSION, tuple(signature))
+
+def get_cache_path(name: str, source_paths: List[str]) -> str:
+    # 원본 엑셀 파일이 있는 폴더 아래 .cache 폴더에 저장한다 (예: data/.cache/menus.pkl)
+    return os.path.join(os.path.dirname(os.path.abspath(source_paths[0])), '.cache', f'{name}.pkl')
+
+def load_cached(name: str, source_paths: List[str], build: Callable[[], T]) -> T:
+    cache_path = get_cache_path(name, source_paths)
+    signature = source_signature(source_paths)
+
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_signature, value = pickle.load(f)
+        if cached_signature == signature:
+            return value
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        pass
+
+    value = build()
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump((signature, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass  # 읽기 전용 위치여도 로딩 자체는 계속한다
+    return value
@@ -0,0 +1,155 @@
+import numpy as np
+from bisect import insort
+from typing import Dict, List
+from Diet_class import NutrientConstraints
+from catalog import MenuCatalog, NUTRIENT_NAMES
+from evaluation_function import EvaluationContext, cost_bounds
+
+class ObjectiveState:
+    # 한 식단의 목적함수 구성요소. apply()는 바뀐 부분만 복사한 새 상태를 돌려준다
+    def __init__(self, genome: np.ndarray, history_genome: np.ndarray, meal_nutrients: np.ndarray, total_cost: float,
+                 harmony_sum: int, harmony_pairs: int, occurrences: Dict[int, List[int]], diversity_terms: Dict[int, float]):
+        self.genome = genome
+        self.history_genome = history_genome
+        self.meal_nutrients = meal_nutrients
+        self.total_cost = total_cost
+        self.harmony_sum = harmony_sum
+        self.harmony_pairs = harmony_pairs
+        self.occurrences = occurrences
+        self.diversity_terms = diversity_terms
+
+class DeltaEvaluator:
+    def __init__(self, context: EvaluationContext, catalog: MenuCatalog, nutrient_constraints: NutrientConstraints):
+        self.context = context
+        self.catalog = catalog
+        self.history_index = catalog.history_index(context)
+        self.min_values = np.array([nutrient_constraints.min_values[nutrient] for nutrient in NUTRIENT_NAMES])
+        self.max_values = np.array([nutrient_constraints.max_values[nutrient] for nutrient in NUTRIENT_NAMES])
+
+    def build(self, genome: np.ndarray) -> ObjectiveState:
+        n_meals = genome.shape[0]
+        history_genome = self.history_index[genome].reshape(-1)
+
+        valid = history_genome[history_genome >= 0]
+        first, second = np.triu_indices(len(valid), k=1)
+        harmony_sum = int(self.context.harmony_matrix[valid[first], valid[second]].sum())
+
+        occurrences = {}
+        for meal, row in enumerate(genome):
+            for menu in row[row >= 0].tolist():
+                occurrences.setdefault(menu, []).append(meal)
+        diversity_terms = {}
+        for menu, meals in occurrences.items():
+            if len(meals) > 1:
+                diversity_terms[menu] = self._diversity_term(meals, n_meals)
+
+        return ObjectiveState(
+            genome=genome.copy(),
+            history_genome=history_genome,
+            meal_nutrients=self.catalog.nutrients[genome].sum(axis=1),
+            total_cost=self._total_cost(genome),
+            harmony_sum=harmony_sum,
+            harmony_pairs=len(first),
+            occurrences=occurrences,
+            diversity_terms=diversity_terms,
+        )
+
+    def apply(self, state: ObjectiveState, positions: np.ndarray, new_menus: np.ndarray) -> ObjectiveState:
+        # positions: (변경 수 x 2) 배열의 (끼니, 슬롯). 변경 하나당 O(식단 길이)
+        genome = state.genome.copy()
+        history_genome = state.history_genome.copy()
+        harmony_sum = state.harmony_sum
+        harmony_pairs = state.harmony_pairs
+        occurrences = dict(state.occurrences)
+        diversity_terms = dict(state.diversity_terms)
+        n_meals, n_slots = genome.shape
+        harmony_matrix = self.context.harmony_matrix
+        copied = set()
+
+        for (meal, slot), new_menu in zip(positions.tolist(), new_menus.tolist()):
+            old_menu = int(genome[meal, slot])
+            if old_menu == new_menu:
+                continue
+            flat = meal * n_slots + slot
+
+            # 조화: 바뀐 슬롯과 나머지 모든 슬롯 사이의 쌍만 다시 더한다
+            old_history, new_history = history_genome[flat], self.history_index[new_menu]
+            history_genome[flat] = -1
+            others = history_genome[history_genome >= 0]
+            if old_history >= 0:
+                harmony_sum -= int(harmony_matrix[old_history, others].sum())
+                harmony_pairs -= len(others)
+            if new_history >= 0:
+                harmony_sum += int(harmony_matrix[new_history, others].sum())
+                harmony_pairs += len(others)
+            history_genome[flat] = new_history
+            genome[meal, slot] = new_menu
+
+            # 다양성: 제거된 메뉴와 추가된 메뉴의 등장 위치만 갱신한다
+            for menu in (old_menu, new_menu):
+                if menu not in copied:
+                    occurrences[menu] = list(occurrences.get(menu, []))
+                    copied.add(menu)
+            occurrences[old_menu].remove(meal)
+            insort(occurrences[new_menu], meal)
+            for menu in (old_menu, new_menu):
+                meals = occurrences[menu]
+                if len(meals) > 1:
+                    diversity_terms[menu] = self._diversity_term(meals, n_meals)
+                else:
+                    diversity_terms.pop(menu, None)
+                    if not meals:
+                        del occurrences[menu]
+                        copied.discard(menu)
+
+        meal_nutrients = state.meal_nutrients.copy()
+        for meal in np.unique(positions[:, 0]).tolist():
+            meal_nutrients[meal] = self.catalog.nutrients[genome[meal]].sum(axis=0)
+
+        return ObjectiveState(
+            genome=genome,
+            history_genome=history_genome,
+            meal_nutrients=meal_nutrients,
+            total_cost=self._total_cost(genome),
+            harmony_sum=harmony_sum,
+            harmony_pairs=harmony_pairs,
+            occurrences=occurrences,
+            diversity_terms=diversity_terms,
+        )
+
+    def scores(self, state: ObjectiveState) -> np.ndarray:
+        # evaluate_*_batch와 같은 식, 같은 순서로 계산해 두 경로의 값이 비트 단위로 같게 한다
+        violations = (state.meal_nutrients < self.min_values) | (state.meal_nutrients > self.max_values)
+        nutrition_score = -float(violations.sum())
+
+        min_cost, max_cost = cost_bounds(self.context, len(state.genome))
+        cost_score = -((state.total_cost - min_cost) / (max_cost - min_cost) * 100)
+
+        harmony_score = 0.0
+        if state.harmony_pairs > 0:
+            harmony_sum = np.int64(state.harmony_sum)
+            normalized = (harmony_sum - state.harmony_pairs * self.context.min_harmony) / (self.context.max_harmony - self.context.min_harmony)
+            harmony_score = normalized * 100 / state.harmony_pairs
+
+        diversity_score = 0.0
+        if state.diversity_terms:
+            total = 0.0
+            for menu in sorted(state.diversity_terms):
+                total += state.diversity_terms[menu]
+            diversity_score = total / len(state.diversity_terms)
+
+        return np.array([nutrition_score, cost_score, harmony_score, diversity_score])
+
+    def _total_cost(self, genome: np.ndarray) -> float:
+        return self.catalog.costs[genome].reshape(1, -1).sum(axis=1)[0]
+
+    @staticmethod
+    def _diversity_term(meals: List[int], n_meals: int) -> float:
+        distances = [meals[i+1] - meals[i] for i in range(len(meals)-1)]
+        count = len(distances)
+        mean_distance = sum(distances) / count
+        variance = sum(float(distance) ** 2 for distance in distances) / count - mean_distance ** 2
+
+        normalized_variance = (variance - 0) / (n_meals**2 / 4)
+        normalized_min_distance = (min(distances) - 1) / (n_meals - 1)
+        return 100 * (-normalized_variance + normalized_min_distance)
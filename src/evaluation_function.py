@@ -1,45 +1,64 @@
 from Diet_class import Menu, Diet, NutrientConstraints
+from catalog import MenuCatalog, NUTRIENT_NAMES
+from harmony import SparseHarmony
 import numpy as np
 from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# 비용 정규화 범위를 구하는 기본 기간(7일 x 3끼)
+MEALS_PER_WEEK = 21
+
+@dataclass(frozen=True, eq=False)
+class EvaluationContext:
+    harmony_matrix: SparseHarmony
+    min_harmony: float
+    max_harmony: float
+    menus: List[str]
+    menu_counts: Counter
+    menu_to_index: Dict[str, int]
+    min_cost: float
+    max_cost: float
+    horizon_meals: int = MEALS_PER_WEEK  # min_cost/max_cost가 몇 끼의 합인지
 
 def evaluate_nutrition(weeklydiet: Diet, nutrient_constraints: NutrientConstraints) -> float:
+    min_values = np.array([nutrient_constraints.min_values[nutrient] for nutrient in NUTRIENT_NAMES])
+    max_values = np.array([nutrient_constraints.max_values[nutrient] for nutrient in NUTRIENT_NAMES])
     total_penalty = 0
     
     for meal in weeklydiet.meals:
-        meal_nutrients = {nutrient: 0 for nutrient in nutrient_constraints.min_values}
-        
-        for menu in meal.menus:
-            for nutrient, amount in menu.nutrients.items():
-                meal_nutrients[nutrient] += amount
-        
-        meal_penalty = 0
-        for nutrient, amount in meal_nutrients.items():
-            min_val = nutrient_constraints.min_values[nutrient]
-            max_val = nutrient_constraints.max_values[nutrient]
-            
-            if amount < min_val or amount > max_val:
-                meal_penalty -= 1
-        
-        total_penalty += meal_penalty
+        # Menu.nutrients는 NUTRIENT_NAMES 순서의 배열이라 끼니 합계를 배열 덧셈으로 구한다
+        meal_nutrients = sum((menu.nutrients for menu in meal.menus), np.zeros(len(NUTRIENT_NAMES)))
+        total_penalty -= int(((meal_nutrients < min_values) | (meal_nutrients > max_values)).sum())
     
     return total_penalty # -105 ~ 0
 
-def evaluate_cost(diet_db: Diet, weeklydiet: Diet) -> float:
+def calculate_meal_cost(meal) -> float:
+    meal_cost = 0
+    for menu in meal.menus:
+        meal_cost += sum(ingredient.price for ingredient in menu.ingredients)
+    return meal_cost
+
+def calculate_cost_bounds(diet_db: Diet, horizon_meals: int = MEALS_PER_WEEK):
+    sorted_cost_db = sorted(calculate_meal_cost(meal) for meal in diet_db.meals)
+    min_cost = sum(sorted_cost_db[:horizon_meals])
+    max_cost = sum(sorted_cost_db[-horizon_meals:])
+    return min_cost, max_cost
+
+def cost_bounds(context: EvaluationContext, n_meals: int) -> Tuple[float, float]:
+    # n_meals끼 식단의 비용 정규화 범위. 기준 기간의 범위를 끼니 수에 비례해 늘리므로 몇 주짜리 식단이든 주 평균 비용으로 점수를 매기는 셈이다.
+    # (가장 싼/비싼 n_meals끼의 합을 쓰면 식단이 과거 DB 길이에 가까워질수록 두 값이 같아져 점수가 폭주한다)
+    # 주의: 예전에는 길이와 상관없이 21끼 범위를 그대로 썼으므로, 21끼가 아닌 식단은 비용 점수가 달라진다.
+    # 예를 들어 load_sample_file 기본값(6일, 18끼) 식단은 범위가 18/21로 줄어 예전보다 낮은(나쁜) 점수가 나온다
+    scale = n_meals / context.horizon_meals
+    return context.min_cost * scale, context.max_cost * scale
+
+def evaluate_cost(context: EvaluationContext, weeklydiet: Diet) -> float:
     total_cost = 0
     for meal in weeklydiet.meals:
-        for menu in meal.menus:
-            total_cost += sum(ingredient.price for ingredient in menu.ingredients)
-
-    cost_db = []
-    for meal in diet_db.meals:
-        meal_cost = 0
-        for menu in meal.menus:
-            meal_cost += sum(ingredient.price for ingredient in menu.ingredients)
-        cost_db.append(meal_cost)
-    sorted_cost_db = sorted(cost_db)
-    min_cost = sum(sorted_cost_db[:21])
-    max_cost = sum(sorted_cost_db[-21:])
+        total_cost += calculate_meal_cost(meal)
 
+    min_cost, max_cost = cost_bounds(context, len(weeklydiet.meals))
     normalized_cost = (total_cost - min_cost) / (max_cost - min_cost) * 100
 
     return -normalized_cost # -100 ~ 0
@@ -72,33 +91,59 @@ def calculate_harmony_matrix(diet_db: Diet):
     
     return harmony_matrix, all_menus, menu_counts, menu_to_index
 
-def evaluate_harmony(diet_db: Diet, weeklydiet: Diet) -> float:
-    harmony_matrix, all_menus, _, menu_to_index = calculate_harmony_matrix(diet_db)
+def calculate_sparse_harmony(diet_db: Diet):
+    menu_counts = Counter()
+    for meal in diet_db.meals:
+        menu_counts.update(menu.name for menu in meal.menus)
 
-    min_harmony = np.min(harmony_matrix)
-    max_harmony = np.max(harmony_matrix)
+    all_menus = sorted(menu_counts)
+    menu_to_index = {menu: i for i, menu in enumerate(all_menus)}
+    meal_indices = [[menu_to_index[menu.name] for menu in meal.menus] for meal in diet_db.meals]
+
+    return SparseHarmony.from_meals(all_menus, meal_indices), all_menus, menu_counts, menu_to_index
+
+def build_evaluation_context(diet_db: Diet, horizon_meals: int = MEALS_PER_WEEK) -> EvaluationContext:
+    # 과거 식단 DB로부터 한 번만 계산해 두고 모든 평가에서 재사용
+    harmony, all_menus, menu_counts, menu_to_index = calculate_sparse_harmony(diet_db)
+    min_cost, max_cost = calculate_cost_bounds(diet_db, horizon_meals)
+
+    return EvaluationContext(
+        harmony_matrix=harmony,
+        min_harmony=harmony.min_value,
+        max_harmony=harmony.max_value,
+        menus=all_menus,
+        menu_counts=menu_counts,
+        menu_to_index=menu_to_index,
+        min_cost=min_cost,
+        max_cost=max_cost,
+        horizon_meals=horizon_meals,
+    )
+
+def evaluate_harmony(context: EvaluationContext, weeklydiet: Diet) -> float:
+    harmony_matrix = context.harmony_matrix
+    menu_to_index = context.menu_to_index
+    min_harmony = context.min_harmony
+    max_harmony = context.max_harmony
 
     all_menus = []
     for meal in weeklydiet.meals:
         all_menus.extend(menu.name for menu in meal.menus)
 
-    harmony_score = 0
-    n_menus = len(all_menus)
-    max_possible_harmony_score = 0
-    
-    for i in range(n_menus):
-        for j in range(i+1, n_menus):
-            idx1 = menu_to_index.get(all_menus[i])
-            idx2 = menu_to_index.get(all_menus[j])
-            if idx1 is not None and idx2 is not None:
-                harmony_value = harmony_matrix[idx1, idx2]
-                normalized_value = (harmony_value - min_harmony) / (max_harmony - min_harmony)
-                harmony_score += normalized_value
-                max_possible_harmony_score += 1
-    
-    return harmony_score / max_possible_harmony_score * 100 if max_possible_harmony_score > 0 else 0 # 0 ~ 100
+    # 과거 식단에 있는 메뉴끼리의 모든 쌍을 한 번에 조회한다
+    indices = np.array([menu_to_index[menu] for menu in all_menus if menu in menu_to_index], dtype=np.int64)
+    first, second = np.triu_indices(len(indices), k=1)
+    max_possible_harmony_score = len(first)
+    if max_possible_harmony_score == 0:
+        return 0
+
+    harmony_values = harmony_matrix[indices[first], indices[second]]
+    harmony_score = ((harmony_values - min_harmony) / (max_harmony - min_harmony)).sum()
+
+    return harmony_score / max_possible_harmony_score * 100 # 0 ~ 100
 
 def get_top_n_harmony_pairs(harmony_matrix, menus, n=5):
+    if isinstance(harmony_matrix, SparseHarmony):
+        return harmony_matrix.top_pairs(n)
     harmony_matrix_no_diag = harmony_matrix - np.diag(np.diag(harmony_matrix))
     top_pairs = []
     for i in range(len(menus)):
@@ -131,4 +176,83 @@ def evaluate_diversity(weeklydiet: Diet) -> float:
             diversity_score = 100 * (-normalized_variance + normalized_min_distance)
             diversity_scores.append(diversity_score)
     
-    return np.mean(diversity_scores) if diversity_scores else 0 # 0 ~ 100
\ No newline at end of file
+    return np.mean(diversity_scores) if diversity_scores else 0 # 0 ~ 100
+
+# 아래 함수들은 (population x meals x slots) 형태의 정수 게놈 배열을 한 번에 평가한다
+def evaluate_nutrition_batch(catalog: MenuCatalog, population: np.ndarray, nutrient_constraints: NutrientConstraints) -> np.ndarray:
+    min_values = np.array([nutrient_constraints.min_values[nutrient] for nutrient in NUTRIENT_NAMES])
+    max_values = np.array([nutrient_constraints.max_values[nutrient] for nutrient in NUTRIENT_NAMES])
+
+    meal_nutrients = catalog.nutrients[population].sum(axis=2)
+    violations = (meal_nutrients < min_values) | (meal_nutrients > max_values)
+
+    return -violations.sum(axis=(1, 2)).astype(float) # -105 ~ 0
+
+def evaluate_cost_batch(context: EvaluationContext, catalog: MenuCatalog, population: np.ndarray) -> np.ndarray:
+    total_cost = catalog.costs[population].reshape(len(population), -1).sum(axis=1)
+
+    min_cost, max_cost = cost_bounds(context, population.shape[1])
+    normalized_cost = (total_cost - min_cost) / (max_cost - min_cost) * 100
+
+    return -normalized_cost # -100 ~ 0
+
+def evaluate_harmony_batch(context: EvaluationContext, catalog: MenuCatalog, population: np.ndarray) -> np.ndarray:
+    menus = catalog.history_index(context)[population].reshape(len(population), -1)
+    first, second = np.triu_indices(menus.shape[1], k=1)
+
+    pair_valid = (menus[:, first] >= 0) & (menus[:, second] >= 0)
+    harmony_values = context.harmony_matrix[menus[:, first], menus[:, second]]
+
+    # 정규화는 선형이므로 정수 합을 먼저 구한 뒤 한 번에 정규화한다
+    n_pairs = pair_valid.sum(axis=1)
+    harmony_sum = np.where(pair_valid, harmony_values, 0).sum(axis=1)
+    harmony_score = (harmony_sum - n_pairs * context.min_harmony) / (context.max_harmony - context.min_harmony)
+
+    return np.divide(harmony_score * 100, n_pairs, out=np.zeros(len(population)), where=n_pairs > 0) # 0 ~ 100
+
+def evaluate_diversity_batch(population: np.ndarray) -> np.ndarray:
+    n_population, n_meals, n_slots = population.shape
+    flat_menus = population.reshape(-1)
+    valid = flat_menus >= 0
+
+    individuals = np.repeat(np.arange(n_population), n_meals * n_slots)[valid]
+    meals = np.tile(np.repeat(np.arange(n_meals), n_slots), n_population)[valid]
+    menus = flat_menus[valid]
+
+    # (개체, 메뉴, 끼니) 순으로 정렬하면 같은 메뉴의 등장 위치가 연속으로 놓인다
+    order = np.lexsort((meals, menus, individuals))
+    individuals, menus, meals = individuals[order], menus[order], meals[order]
+
+    same_menu = (individuals[1:] == individuals[:-1]) & (menus[1:] == menus[:-1])
+    groups = np.cumsum(np.concatenate(([0], ~same_menu)))
+    distances = (meals[1:] - meals[:-1])[same_menu]
+    distance_groups = groups[:-1][same_menu]
+    distance_individuals = individuals[:-1][same_menu]
+
+    scores = np.zeros(n_population)
+    if len(distances) == 0:
+        return scores
+
+    group_starts = np.flatnonzero(np.concatenate(([True], distance_groups[1:] != distance_groups[:-1])))
+    counts = np.diff(np.append(group_starts, len(distances)))
+    mean_distance = np.add.reduceat(distances, group_starts) / counts
+    variance = np.add.reduceat(distances.astype(float) ** 2, group_starts) / counts - mean_distance ** 2
+    min_distance = np.minimum.reduceat(distances, group_starts)
+
+    normalized_variance = (variance - 0) / (n_meals**2 / 4)
+    normalized_min_distance = (min_distance - 1) / (n_meals - 1)
+    diversity_scores = 100 * (-normalized_variance + normalized_min_distance)
+
+    group_individuals = distance_individuals[group_starts]
+    totals = np.bincount(group_individuals, weights=diversity_scores, minlength=n_population)
+    n_scores = np.bincount(group_individuals, minlength=n_population)
+
+    return np.divide(totals, n_scores, out=scores, where=n_scores > 0) # 0 ~ 100
+
+def evaluate_population(context: EvaluationContext, catalog: MenuCatalog, population: np.ndarray, nutrient_constraints: NutrientConstraints) -> np.ndarray:
+    nutrition_scores = evaluate_nutrition_batch(catalog, population, nutrient_constraints)
+    cost_scores = evaluate_cost_batch(context, catalog, population)
+    harmony_scores = evaluate_harmony_batch(context, catalog, population)
+    diversity_scores = evaluate_diversity_batch(population)
+
+    return np.column_stack([nutrition_scores, cost_scores, harmony_scores, diversity_scores])
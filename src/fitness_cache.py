@@ -0,0 +1,52 @@
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+class FitnessCache:
+    def __init__(self, max_size: int = 50000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(genome: np.ndarray) -> Hashable:
+        # 게놈의 원시 바이트를 그대로 키로 쓰므로 해시 충돌이 있어도 잘못된 값을 돌려주지 않는다
+        return genome.shape, genome.tobytes()
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: np.ndarray):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def clear(self):
+        self._entries.clear()
+        self.reset_stats()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,101 @@
+import numpy as np
+from typing import Dict, List, Tuple
+
+class SparseHarmony:
+    # 메뉴 동시 출현 횟수를 (i < j) 쌍 키 i * n + j의 정렬 배열로 보관한다.
+    # 대각 성분은 메뉴 등장 횟수이며, 조밀 행렬처럼 harmony[rows, cols]로 조회할 수 있다
+    DENSE_LIMIT = 2048
+
+    def __init__(self, menus: List[str], menu_counts: np.ndarray, pair_keys: np.ndarray, pair_counts: np.ndarray):
+        self.menus = menus
+        self.menu_to_index = {menu: i for i, menu in enumerate(menus)}
+        self.n_menus = len(menus)
+        self.menu_counts = np.asarray(menu_counts, dtype=np.int64)
+        self.pair_keys = np.asarray(pair_keys, dtype=np.int64)
+        self.pair_counts = np.asarray(pair_counts, dtype=np.int64)
+        self._dense = None
+
+        n_pairs = self.n_menus * (self.n_menus - 1) // 2
+        values = [self.menu_counts, self.pair_counts]
+        if len(self.pair_keys) < n_pairs:
+            values.append(np.zeros(1, dtype=np.int64))  # 한 번도 함께 나오지 않은 쌍이 있으면 최솟값은 0
+        values = np.concatenate(values)
+        self.min_value = values.min() if len(values) else 0
+        self.max_value = values.max() if len(values) else 0
+
+    @classmethod
+    def from_meals(cls, menus: List[str], meal_indices: List[List[int]]) -> 'SparseHarmony':
+        n_menus = len(menus)
+        max_length = max((len(meal) for meal in meal_indices), default=0)
+        padded = np.full((len(meal_indices), max_length), -1, dtype=np.int64)
+        for i, meal in enumerate(meal_indices):
+            padded[i, :len(meal)] = meal
+
+        menu_counts = np.bincount(padded[padded >= 0], minlength=n_menus)
+        pair_keys, pair_counts = count_pairs(padded, n_menus)
+        return cls(menus, menu_counts, pair_keys, pair_counts)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.n_menus, self.n_menus)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.pair_keys)
+
+    def __getitem__(self, index) -> np.ndarray:
+        if self.n_menus <= self.DENSE_LIMIT:
+            return self.to_dense()[index]  # 작은 조회가 많은 증분 평가에서는 broadcast 비용이 조회보다 커서 바로 넘긴다
+        rows, cols = np.broadcast_arrays(*(np.asarray(i, dtype=np.int64) for i in index))
+
+        low, high = np.minimum(rows, cols), np.maximum(rows, cols)
+        keys = low * self.n_menus + high
+        # 조회 키를 정렬해 두고 찾으면 캐시 적중이 좋아져 큰 배치에서 몇 배 빠르다
+        order = np.argsort(keys, axis=None)
+        positions = np.empty(keys.size, dtype=np.int64)
+        positions[order] = np.searchsorted(self.pair_keys, keys.ravel()[order])
+        positions = np.minimum(positions.reshape(keys.shape), max(self.nnz - 1, 0))
+        found = self.pair_keys[positions] == keys if self.nnz else np.zeros(keys.shape, dtype=bool)
+        values = np.where(found, self.pair_counts[positions] if self.nnz else 0, 0)
+        values = np.where(rows == cols, self.menu_counts[rows], values)
+        return values if values.ndim else values[()]
+
+    def to_dense(self) -> np.ndarray:
+        if self._dense is None:
+            dense = np.zeros((self.n_menus, self.n_menus), dtype=np.int64)
+            first, second = np.divmod(self.pair_keys, self.n_menus)
+            dense[first, second] = self.pair_counts
+            dense[second, first] = self.pair_counts
+            dense[np.arange(self.n_menus), np.arange(self.n_menus)] = self.menu_counts
+            dense.setflags(write=False)
+            self._dense = dense
+        return self._dense
+
+    def top_pairs(self, n: int = 5) -> List[Tuple[str, str, int]]:
+        n = min(n, self.nnz)
+        if n <= 0:
+            return []
+        # n번째로 큰 값과 같은 쌍까지 후보로 두고, 횟수 내림차순·(i, j) 오름차순으로 정렬해 조밀 구현과 같은 순서를 낸다
+        threshold = np.partition(self.pair_counts, self.nnz - n)[self.nnz - n]
+        candidates = np.flatnonzero(self.pair_counts >= threshold)
+        candidates = candidates[np.lexsort((self.pair_keys[candidates], -self.pair_counts[candidates]))][:n]
+        first, second = np.divmod(self.pair_keys[candidates], self.n_menus)
+        return [(self.menus[i], self.menus[j], int(count))
+                for i, j, count in zip(first.tolist(), second.tolist(), self.pair_counts[candidates].tolist())]
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state['_dense'] = None  # 조밀 캐시는 프로세스마다 다시 만든다
+        return state
+
+def count_pairs(padded_meals: np.ndarray, n_menus: int) -> Tuple[np.ndarray, np.ndarray]:
+    # (끼니 수 x 최대 메뉴 수) 배열에서 같은 끼니에 나온 서로 다른 메뉴 쌍의 횟수를 센다
+    if padded_meals.shape[1] < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    first, second = np.triu_indices(padded_meals.shape[1], k=1)
+    menus1, menus2 = padded_meals[:, first].ravel(), padded_meals[:, second].ravel()
+    valid = (menus1 >= 0) & (menus2 >= 0) & (menus1 != menus2)
+    menus1, menus2 = menus1[valid], menus2[valid]
+
+    keys = np.minimum(menus1, menus2) * n_menus + np.maximum(menus1, menus2)
+    return np.unique(keys, return_counts=True)
@@ -0,0 +1,97 @@
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Tuple
+from Diet_class import Diet
+from harmony import SparseHarmony
+
+def top_k_indices(values: np.ndarray, k: int) -> np.ndarray:
+    # 값 내림차순, 같으면 인덱스 오름차순으로 상위 k개. 전체 정렬 대신 k번째 값 이상인 후보만 정렬한다
+    k = min(k, len(values))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    threshold = np.partition(values, len(values) - k)[len(values) - k]
+    candidates = np.flatnonzero(values >= threshold)
+    return candidates[np.lexsort((candidates, -values[candidates]))][:k]
+
+class HistoryAnalytics:
+    # 과거 식단 DB의 조화 행렬(SparseHarmony) 위에서 대시보드용 상위 k 질의에 답한다.
+    # 한 번 계산한 답은 (질의, 인자)별로 기억하며, DB가 바뀌면 get_history_analytics가 새 객체를 만든다
+    def __init__(self, harmony: SparseHarmony, menu_categories: Dict[str, str]):
+        self.harmony = harmony
+        self.category_names = sorted(set(menu_categories.get(menu, '') for menu in harmony.menus))
+        category_to_code = {category: i for i, category in enumerate(self.category_names)}
+        self.categories = np.array([category_to_code[menu_categories.get(menu, '')] for menu in harmony.menus], dtype=np.int64)
+        self._partners = None
+        self._results: Dict[Tuple, List] = {}
+
+    @classmethod
+    def from_history(cls, harmony: SparseHarmony, diet_db: Diet) -> 'HistoryAnalytics':
+        return cls(harmony, {menu.name: menu.category for meal in diet_db.meals for menu in meal.menus})
+
+    def _memoize(self, key: Tuple, compute: Callable[[], List]) -> List:
+        if key not in self._results:
+            self._results[key] = compute()
+        return self._results[key]
+
+    def top_pairs(self, k: int = 5) -> List[Tuple[str, str, int]]:
+        return self._memoize(('pairs', k), lambda: self.harmony.top_pairs(k))
+
+    def top_menus(self, k: int = 5) -> List[Tuple[str, int]]:
+        def compute():
+            counts = self.harmony.menu_counts
+            return [(self.harmony.menus[i], int(counts[i])) for i in top_k_indices(counts, k).tolist()]
+        return self._memoize(('menus', k), compute)
+
+    def top_partners(self, menu: str, k: int = 5) -> List[Tuple[str, int]]:
+        # 주어진 메뉴와 가장 많이 함께 나온 메뉴들
+        def compute():
+            index = self.harmony.menu_to_index.get(menu)
+            if index is None:
+                return []
+            harmony = self.harmony
+            n = harmony.n_menus
+            # index가 앞쪽(i)인 쌍은 정렬된 키에서 연속 구간이고, 뒤쪽(j)인 쌍은 j로 정렬해 둔 색인에서 연속 구간이다
+            low, high = np.searchsorted(harmony.pair_keys, [index * n, (index + 1) * n])
+            by_second, second_starts = self._partner_index()
+            as_second = by_second[second_starts[index]:second_starts[index + 1]]
+            partners = np.concatenate((harmony.pair_keys[as_second] // n, harmony.pair_keys[low:high] % n))
+            counts = np.concatenate((harmony.pair_counts[as_second], harmony.pair_counts[low:high]))
+            top = top_k_indices(counts, k)  # 앞 구간의 짝은 index보다 작고 뒤 구간의 짝은 커서, 짝 인덱스 오름차순으로 이어져 있다
+            return [(harmony.menus[i], int(count)) for i, count in zip(partners[top].tolist(), counts[top].tolist())]
+        return self._memoize(('partners', menu, k), compute)
+
+    def top_menus_by_category(self, k: int = 5) -> Dict[str, List[Tuple[str, int]]]:
+        def compute():
+            counts = self.harmony.menu_counts
+            result = {}
+            order = np.argsort(self.categories, kind='stable')
+            starts = np.searchsorted(self.categories[order], np.arange(len(self.category_names) + 1))
+            for code, category in enumerate(self.category_names):
+                members = order[starts[code]:starts[code + 1]]
+                top = members[top_k_indices(counts[members], k)]
+                result[category] = [(self.harmony.menus[i], int(counts[i])) for i in top.tolist()]
+            return result
+        return self._memoize(('categories', k), compute)
+
+    def _partner_index(self) -> Tuple[np.ndarray, np.ndarray]:
+        # 쌍 키 i * n + j (i < j)를 j 기준으로 안정 정렬한 순서와 j별 시작 위치. 한 번만 만든다
+        if self._partners is None:
+            harmony = self.harmony
+            second = harmony.pair_keys % harmony.n_menus
+            by_second = np.argsort(second, kind='stable')
+            second_starts = np.concatenate(([0], np.cumsum(np.bincount(second, minlength=harmony.n_menus))))
+            self._partners = (by_second, second_starts)
+        return self._partners
+
+# 이력 DB 버전(예: data_cache.source_signature)별 분석 객체. DB가 바뀌어 버전이 달라지면 새로 만들고 오래된 것부터 버린다
+_analytics: 'OrderedDict[Hashable, HistoryAnalytics]' = OrderedDict()
+MAX_VERSIONS = 4
+
+def get_history_analytics(version: Hashable, build: Callable[[], HistoryAnalytics]) -> HistoryAnalytics:
+    if version in _analytics:
+        _analytics.move_to_end(version)
+    else:
+        _analytics[version] = build()
+        while len(_analytics) > MAX_VERSIONS:
+            _analytics.popitem(last=False)
+    return _analytics[version]
@@ -0,0 +1,274 @@
+import bisect
+import dataclasses
+import os
+import numpy as np
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, Iterator, List, Set, Tuple
+from Diet_class import Menu, Meal
+from evaluation_function import EvaluationContext, calculate_meal_cost
+from harmony import SparseHarmony
+from history_stream import iter_history_meals
+
+# 저장하는 배열 구성이 바뀌면 올려서 이전 파일을 읽지 않게 한다
+HISTORY_MODEL_VERSION = 2
+
+class HistoryModel:
+    # 과거 식단에서 평가 기준(조화 행렬, 메뉴 등장 횟수, 비용 범위)을 만드는 재료를 들고 있다가, 끼니를 더하고 뺄 때 바뀐 만큼만 고친다.
+    # - 메뉴 쌍 횟수는 i * KEY_RADIX + j (i < j) 키의 딕셔너리
+    # - 조화 최솟값/최댓값은 (횟수 값 -> 그 값을 가진 항목 수) 히스토그램에서 구한다
+    # - 비용 범위는 끼니 비용을 정렬된 리스트로 두고 bisect로 넣고 뺀다
+    # - 들어온 끼니는 번호를 붙여 순서대로 남겨 두어 remove_oldest로 "최근 12개월" 같은 구간을 유지할 수 있다.
+    #   (메뉴 구성 -> 끼니 번호) 역색인이 있어 remove_meals도 기록 전체를 훑지 않는다
+    KEY_RADIX = 1 << 31
+
+    def __init__(self, cost_window: int = 21):
+        self.cost_window = cost_window
+        self.names: List[str] = []
+        self.name_to_index: Dict[str, int] = {}
+        self.menu_counts: Dict[int, int] = {}
+        self.menu_costs: Dict[int, float] = {}  # 끼니 비용을 다시 계산할 때 쓰는 메뉴별 비용 (마지막으로 들어온 값)
+        self.pair_counts: Dict[int, int] = {}
+        self.value_counts = Counter()
+        self.meal_costs: List[float] = []
+        self.records: Dict[int, Tuple[Tuple[int, ...], float]] = {}  # 끼니 번호 -> (메뉴 인덱스들, 비용)
+        self.order: Deque[int] = deque()  # 들어온 순서의 끼니 번호. 중간에서 뺀 번호는 꺼낼 때 건너뛴다
+        self.meal_ids: Dict[Tuple[int, ...], Deque[int]] = {}  # 메뉴 구성 -> 그 구성의 끼니 번호들 (오래된 순)
+        self.menu_meals: Dict[int, Set[int]] = {}  # 메뉴 인덱스 -> 그 메뉴가 들어간 끼니 번호들 (reprice용)
+        self._next_id = 0
+        self._context = None
+
+    @classmethod
+    def from_meals(cls, meals: Iterable[Meal], cost_window: int = 21) -> 'HistoryModel':
+        model = cls(cost_window)
+        model.add_meals(meals)
+        return model
+
+    @classmethod
+    def from_file(cls, diet_db_path, menu_objects: Dict[str, Menu], cost_window: int = 21) -> 'HistoryModel':
+        return cls.from_meals(iter_history_meals(diet_db_path, menu_objects), cost_window)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def meals(self) -> Iterator[Tuple[Tuple[int, ...], float]]:
+        # 남아 있는 끼니 기록 (메뉴 인덱스들, 비용)을 들어온 순서대로
+        records = self.records
+        return (records[meal_id] for meal_id in self.order if meal_id in records)
+
+    def add_meals(self, meals: Iterable[Meal]):
+        for meal in meals:
+            indices = tuple(self._menu_index(menu.name) for menu in meal.menus)
+            for index, menu in zip(indices, meal.menus):
+                self.menu_costs[index] = sum(ingredient.price for ingredient in menu.ingredients)
+            cost = calculate_meal_cost(meal)
+            self._update(indices, 1)
+            bisect.insort(self.meal_costs, cost)
+            self._append(indices, cost)
+        self._context = None
+
+    def remove_meals(self, meals: Iterable[Meal]):
+        # 메뉴 구성이 같은 끼니 기록 중 가장 오래된 것을 뺀다. 역색인으로 바로 찾으므로 기록 수와 무관하다.
+        # 없는 끼니가 하나라도 있으면 아무것도 빼지 않고 ValueError를 낸다
+        targets = []
+        taken = Counter()  # 같은 구성을 여러 번 빼면 그만큼 오래된 순으로 고른다
+        for meal in meals:
+            indices = tuple(self.name_to_index.get(menu.name, -1) for menu in meal.menus)
+            meal_ids = self.meal_ids.get(indices, ())
+            if taken[indices] >= len(meal_ids):
+                raise ValueError(f'Meal {meal.date} {meal.meal_type} is not in the history model')
+            targets.append(meal_ids[taken[indices]])
+            taken[indices] += 1
+
+        for meal_id in targets:
+            self._discard(meal_id)
+        if targets:
+            self._context = None
+
+    def remove_oldest(self, n_meals: int):
+        for _ in range(min(n_meals, len(self.records))):
+            self._discard(self._oldest())
+        self._context = None
+
+    def _append(self, indices: Tuple[int, ...], cost: float):
+        meal_id = self._next_id
+        self._next_id += 1
+        self.records[meal_id] = (indices, cost)
+        self.order.append(meal_id)
+        self.meal_ids.setdefault(indices, deque()).append(meal_id)
+        for index in indices:
+            self.menu_meals.setdefault(index, set()).add(meal_id)
+
+    def _oldest(self) -> int:
+        # 중간에서 빠진 번호를 앞에서 걸러 낸다. 번호마다 한 번만 걸러지므로 상각 O(1)
+        while self.order[0] not in self.records:
+            self.order.popleft()
+        return self.order[0]
+
+    def _discard(self, meal_id: int):
+        indices, cost = self.records.pop(meal_id)
+        # 같은 구성의 끼니 번호는 오래된 순으로 쌓이고 빼는 쪽은 늘 가장 오래된 것이다
+        meal_ids = self.meal_ids[indices]
+        meal_ids.popleft()
+        if not meal_ids:
+            del self.meal_ids[indices]
+        for index in set(indices):
+            menu_meals = self.menu_meals[index]
+            menu_meals.discard(meal_id)
+            if not menu_meals:
+                del self.menu_meals[index]
+        if self.order[0] == meal_id:
+            self.order.popleft()
+        elif len(self.order) > 2 * len(self.records) + 64:
+            # 중간에서 뺀 번호가 쌓이면 순서 목록을 한 번 다시 만든다 (상각 O(1))
+            self.order = deque(i for i in self.order if i in self.records)
+        self._forget(indices, cost)
+
+    def reprice(self, menu_costs: Dict[str, float]):
+        # 메뉴 비용이 바뀌면(MenuCatalog.reprice 참고) 메뉴 -> 끼니 역색인으로 그 메뉴가 들어간 끼니만 찾아 비용을 다시 계산하고,
+        # 정렬된 비용 리스트에서 바꿔 끼운다.
+        # 만들어 둔 평가 기준이 있으면 조화 행렬은 그대로 두고 비용 범위만 바꾼다
+        changed = {self.name_to_index[name]: cost for name, cost in menu_costs.items() if name in self.name_to_index}
+        if not changed:
+            return
+        self.menu_costs.update(changed)
+        affected = set()
+        for index in changed:
+            affected.update(self.menu_meals.get(index, ()))
+        for meal_id in affected:
+            indices, old_cost = self.records[meal_id]
+            cost = 0
+            for index in indices:
+                cost += self.menu_costs[index]
+            self.records[meal_id] = (indices, cost)
+            del self.meal_costs[bisect.bisect_left(self.meal_costs, old_cost)]
+            bisect.insort(self.meal_costs, cost)
+        if self._context is not None:
+            min_cost, max_cost = self.cost_bounds()
+            self._context = dataclasses.replace(self._context, min_cost=min_cost, max_cost=max_cost)
+
+    def _menu_index(self, name: str) -> int:
+        index = self.name_to_index.get(name)
+        if index is None:
+            index = self.name_to_index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def _forget(self, indices: Tuple[int, ...], cost: float):
+        self._update(indices, -1)
+        del self.meal_costs[bisect.bisect_left(self.meal_costs, cost)]
+
+    def _update(self, indices: Tuple[int, ...], sign: int):
+        # count_pairs와 같이 메뉴는 나온 횟수만큼, 쌍은 같은 끼니 안의 서로 다른 메뉴 위치 쌍마다 센다
+        for index in indices:
+            self._add(self.menu_counts, index, sign)
+        for i, first in enumerate(indices):
+            for second in indices[i + 1:]:
+                if first != second:
+                    self._add(self.pair_counts, min(first, second) * self.KEY_RADIX + max(first, second), sign)
+
+    def _add(self, counts: Dict[int, int], key: int, sign: int):
+        old = counts.get(key, 0)
+        new = old + sign
+        if old:
+            self.value_counts[old] -= 1
+            if not self.value_counts[old]:
+                del self.value_counts[old]
+        if new:
+            counts[key] = new
+            self.value_counts[new] += 1
+        else:
+            del counts[key]
+
+    @property
+    def min_harmony(self) -> int:
+        # SparseHarmony와 같이, 한 번도 함께 나오지 않은 메뉴 쌍이 있으면 0
+        n_menus = len(self.menu_counts)
+        if len(self.pair_counts) < n_menus * (n_menus - 1) // 2 or not self.value_counts:
+            return 0
+        return min(self.value_counts)
+
+    @property
+    def max_harmony(self) -> int:
+        return max(self.value_counts, default=0)
+
+    def cost_bounds(self) -> Tuple[float, float]:
+        return sum(self.meal_costs[:self.cost_window]), sum(self.meal_costs[-self.cost_window:])
+
+    def to_harmony(self) -> SparseHarmony:
+        # 등장 횟수가 남아 있는 메뉴만 이름순으로 다시 번호를 매긴다
+        present = sorted(self.menu_counts, key=self.names.__getitem__)
+        rank = np.full(len(self.names), -1, dtype=np.int64)
+        rank[present] = np.arange(len(present))
+
+        keys = np.fromiter(self.pair_counts.keys(), dtype=np.int64, count=len(self.pair_counts))
+        counts = np.fromiter(self.pair_counts.values(), dtype=np.int64, count=len(self.pair_counts))
+        first, second = np.divmod(keys, self.KEY_RADIX)
+        first, second = rank[first], rank[second]
+        keys = np.minimum(first, second) * len(present) + np.maximum(first, second)
+        order = np.argsort(keys)
+        menu_counts = np.array([self.menu_counts[i] for i in present], dtype=np.int64)
+        return SparseHarmony([self.names[i] for i in present], menu_counts, keys[order], counts[order])
+
+    def to_context(self) -> EvaluationContext:
+        # build_evaluation_context(Diet(남아 있는 끼니들))과 같은 값. 끼니가 바뀌기 전까지는 만든 것을 다시 쓴다
+        if self._context is None:
+            harmony = self.to_harmony()
+            min_cost, max_cost = self.cost_bounds()
+            self._context = EvaluationContext(
+                harmony_matrix=harmony,
+                min_harmony=self.min_harmony,
+                max_harmony=self.max_harmony,
+                menus=harmony.menus,
+                menu_counts=Counter(dict(zip(harmony.menus, harmony.menu_counts.tolist()))),
+                menu_to_index=harmony.menu_to_index,
+                min_cost=min_cost,
+                max_cost=max_cost,
+                horizon_meals=self.cost_window,
+            )
+        return self._context
+
+    def save(self, path: str):
+        # 끼니 기록(메뉴 번호와 비용)만 저장해도 나머지는 되살릴 수 있지만, 다시 세지 않도록 횟수도 함께 담는다
+        meals = list(self.meals())
+        width = max((len(indices) for indices, _ in meals), default=0)
+        meal_menus = np.full((len(meals), width), -1, dtype=np.int64)
+        for row, (indices, _) in enumerate(meals):
+            meal_menus[row, :len(indices)] = indices
+        arrays = {
+            'version': np.int64(HISTORY_MODEL_VERSION),
+            'cost_window': np.int64(self.cost_window),
+            'names': np.array(self.names, dtype=str),
+            'menu_indices': np.fromiter(self.menu_counts.keys(), dtype=np.int64, count=len(self.menu_counts)),
+            'menu_counts': np.fromiter(self.menu_counts.values(), dtype=np.int64, count=len(self.menu_counts)),
+            'cost_indices': np.fromiter(self.menu_costs.keys(), dtype=np.int64, count=len(self.menu_costs)),
+            'menu_costs': np.fromiter(self.menu_costs.values(), dtype=float, count=len(self.menu_costs)),
+            'pair_keys': np.fromiter(self.pair_counts.keys(), dtype=np.int64, count=len(self.pair_counts)),
+            'pair_counts': np.fromiter(self.pair_counts.values(), dtype=np.int64, count=len(self.pair_counts)),
+            'meal_menus': meal_menus,
+            'meal_costs': np.array([cost for _, cost in meals], dtype=float),
+        }
+        # checkpoint.save_checkpoint와 같이 임시 파일에 쓴 뒤 바꿔 끼운다
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'HistoryModel':
+        with np.load(path) as data:
+            if int(data['version']) != HISTORY_MODEL_VERSION:
+                raise ValueError(f"Unsupported history model version {int(data['version'])} in {path}")
+            model = cls(int(data['cost_window']))
+            model.names = data['names'].tolist()
+            model.name_to_index = {name: i for i, name in enumerate(model.names)}
+            model.menu_counts = dict(zip(data['menu_indices'].tolist(), data['menu_counts'].tolist()))
+            model.menu_costs = dict(zip(data['cost_indices'].tolist(), data['menu_costs'].tolist()))
+            model.pair_counts = dict(zip(data['pair_keys'].tolist(), data['pair_counts'].tolist()))
+            model.value_counts = Counter(data['menu_counts'].tolist())
+            model.value_counts.update(data['pair_counts'].tolist())
+            costs = data['meal_costs'].tolist()
+            for row, cost in zip(data['meal_menus'].tolist(), costs):
+                model._append(tuple(index for index in row if index >= 0), cost)
+            model.meal_costs = sorted(costs)
+        return model
@@ -0,0 +1,158 @@
+import heapq
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+from openpyxl import load_workbook
+from Diet_class import Menu, Meal
+from evaluation_function import EvaluationContext
+from harmony import SparseHarmony, count_pairs
+
+HISTORY_COLUMNS = ['Day', 'MealType', 'Menus']
+
+def iter_history_rows(path, chunk_rows: int = 50000) -> Iterator[Tuple[str, str, str]]:
+    # 과거 식단 파일을 (Day, MealType, Menus 문자열)로 한 행씩 읽는다.
+    # 엑셀은 openpyxl 읽기 전용 모드로, CSV는 chunk_rows행씩 읽어 파일 전체를 메모리에 올리지 않는다
+    if str(path).lower().endswith('.csv'):
+        for chunk in pd.read_csv(path, usecols=HISTORY_COLUMNS, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+            yield from zip(chunk['Day'].tolist(), chunk['MealType'].tolist(), chunk['Menus'].tolist())
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook['sample'] if 'sample' in workbook.sheetnames else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        columns = [header.index(column) for column in HISTORY_COLUMNS]
+        for row in rows:
+            day, meal_type, menus = (row[i] for i in columns)
+            if menus is not None:
+                yield str(day), meal_type, str(menus)
+    finally:
+        workbook.close()
+
+def split_menus(menus: str, menu_objects: Dict[str, Menu]) -> List[str]:
+    # read_diet과 같이 메뉴 DB에 없는 메뉴는 뺀다
+    names = (name.strip() for name in menus.split(','))
+    return [name for name in names if name in menu_objects]
+
+def iter_history_meals(path, menu_objects: Dict[str, Menu], chunk_rows: int = 50000) -> Iterator[Meal]:
+    for day, meal_type, menus in iter_history_rows(path, chunk_rows):
+        yield Meal([menu_objects[name] for name in split_menus(menus, menu_objects)], day, meal_type)
+
+class HistoryAccumulator:
+    # 끼니를 하나씩 받아 메뉴 등장 횟수, 메뉴 쌍 동시 출현 횟수, 비용 범위를 누적한다.
+    # 끼니는 flush_meals개씩 모아 한 번에 세어 정렬된 쌍 배열에 합치므로, 메모리는 (서로 다른 쌍 수 + 버퍼) 크기로 묶인다
+    KEY_RADIX = 1 << 31  # 누적 중에는 메뉴 수가 계속 늘어나므로 쌍 키를 i * KEY_RADIX + j로 둔다
+
+    def __init__(self, menu_costs: Dict[str, float] = None, cost_window: int = 21, flush_meals: int = 20000):
+        self.names: List[str] = []
+        self.name_to_index: Dict[str, int] = {}
+        self.menu_counts = np.zeros(0, dtype=np.int64)
+        self.pair_keys = np.zeros(0, dtype=np.int64)
+        self.pair_counts = np.zeros(0, dtype=np.int64)
+        self.n_meals = 0
+        self.flush_meals = flush_meals
+        self._buffer: List[List[int]] = []
+
+        # 비용 범위는 가장 싼/비싼 cost_window끼의 합이므로 두 힙에 그만큼만 남긴다 (calculate_cost_bounds와 같은 값)
+        self.menu_costs = menu_costs
+        self.cost_window = cost_window
+        self._cheapest: List[float] = []  # 부호를 바꾼 최대 힙
+        self._priciest: List[float] = []
+
+    def add_meal(self, menu_names: List[str]):
+        name_to_index = self.name_to_index
+        indices = []
+        for name in menu_names:
+            index = name_to_index.get(name)
+            if index is None:
+                index = name_to_index[name] = len(self.names)
+                self.names.append(name)
+            indices.append(index)
+        self._buffer.append(indices)
+        self.n_meals += 1
+
+        if self.menu_costs is not None:
+            cost = 0
+            for name in menu_names:
+                cost += self.menu_costs[name]
+            if len(self._priciest) < self.cost_window:
+                heapq.heappush(self._cheapest, -cost)
+                heapq.heappush(self._priciest, cost)
+            else:
+                heapq.heappushpop(self._cheapest, -cost)
+                heapq.heappushpop(self._priciest, cost)
+
+        if len(self._buffer) >= self.flush_meals:
+            self.flush()
+
+    def flush(self):
+        meals, self._buffer = self._buffer, []
+        self.menu_counts = np.concatenate((self.menu_counts, np.zeros(len(self.names) - len(self.menu_counts), dtype=np.int64)))
+        lengths = np.fromiter((len(meal) for meal in meals), dtype=np.int64, count=len(meals))
+        if lengths.sum() == 0:
+            return
+
+        flat = np.fromiter((index for meal in meals for index in meal), dtype=np.int64, count=int(lengths.sum()))
+        rows = np.repeat(np.arange(len(meals)), lengths)
+        cols = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        padded = np.full((len(meals), lengths.max()), -1, dtype=np.int64)
+        padded[rows, cols] = flat
+        self.menu_counts += np.bincount(flat, minlength=len(self.names))
+
+        # 이번 버퍼의 쌍을 세어 정렬된 누적 배열에 더하고, 처음 나온 쌍은 제자리에 끼워 넣는다
+        keys, counts = count_pairs(padded, self.KEY_RADIX)
+        positions = np.searchsorted(self.pair_keys, keys)
+        found = positions < len(self.pair_keys)
+        found[found] = self.pair_keys[positions[found]] == keys[found]
+        self.pair_counts[positions[found]] += counts[found]
+        self.pair_keys = np.insert(self.pair_keys, positions[~found], keys[~found])
+        self.pair_counts = np.insert(self.pair_counts, positions[~found], counts[~found])
+
+    def to_harmony(self) -> SparseHarmony:
+        # build_evaluation_context와 같이 메뉴 이름순 인덱스로 바꿔 SparseHarmony를 만든다
+        self.flush()
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        n_menus = len(order)
+        # 쌍 수에 비례하는 임시 배열이 최대 메모리를 정하므로 가능한 한 제자리에서 계산한다
+        first, second = np.divmod(self.pair_keys, self.KEY_RADIX)
+        first, second = rank[first], rank[second]
+        keys = np.minimum(first, second)
+        np.maximum(first, second, out=first)
+        del second
+        keys *= n_menus
+        keys += first
+        del first
+        key_order = np.argsort(keys, kind='stable')
+        return SparseHarmony([self.names[i] for i in order], self.menu_counts[order], keys[key_order], self.pair_counts[key_order])
+
+    def cost_bounds(self) -> Tuple[float, float]:
+        return sum(sorted(-cost for cost in self._cheapest)), sum(sorted(self._priciest))
+
+    def to_context(self) -> EvaluationContext:
+        harmony = self.to_harmony()
+        min_cost, max_cost = self.cost_bounds()
+        return EvaluationContext(
+            harmony_matrix=harmony,
+            min_harmony=harmony.min_value,
+            max_harmony=harmony.max_value,
+            menus=harmony.menus,
+            menu_counts=Counter(dict(zip(harmony.menus, harmony.menu_counts.tolist()))),
+            menu_to_index=harmony.menu_to_index,
+            min_cost=min_cost,
+            max_cost=max_cost,
+            horizon_meals=self.cost_window,
+        )
+
+def load_history_context(diet_db_path, menu_objects: Dict[str, Menu], chunk_rows: int = 50000,
+                         flush_meals: int = 20000, cost_window: int = 21) -> EvaluationContext:
+    # load_and_process_data + build_evaluation_context와 같은 평가 기준을, Meal 목록을 만들지 않고 파일을 한 번 훑어 만든다
+    menu_costs = {name: sum(ingredient.price for ingredient in menu.ingredients) for name, menu in menu_objects.items()}
+    accumulator = HistoryAccumulator(menu_costs, cost_window, flush_meals)
+    for _, _, menus in iter_history_rows(diet_db_path, chunk_rows):
+        accumulator.add_meal(split_menus(menus, menu_objects))
+    return accumulator.to_context()
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from Diet_class import Diet, NutrientConstraints
+from catalog import MenuCatalog
+from evaluation_function import EvaluationContext
+from MOO import MultiObjectiveDietOptimizer, PopulationState
+from archive import ParetoArchive
+from parallel_fitness import init_worker, worker_data
+
+def _run_epoch(seed: np.random.SeedSequence, rng_state: Dict, mutation_rate: float, initial_genome: np.ndarray, initial_fitness: List[float],
+               state: PopulationState, generations: int, population_size: int) -> Tuple[PopulationState, Dict, str]:
+    # 섬 하나를 generations세대 진행한다. 섬의 상태는 (개체군 상태, 난수 상태)로 주고받으므로 어느 워커에서 돌아도 결과가 같다
+    # 워커 데이터는 (평가 데이터, 최적화 옵션)
+    context, catalog, nutrient_constraints, optimizer_options = worker_data()
+    optimizer = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context, seed=seed, mutation_rate=mutation_rate, **optimizer_options)
+    if rng_state is not None:
+        optimizer.rng.bit_generator.state = rng_state
+    if state is None:
+        state = optimizer.initial_population(initial_genome, initial_fitness, population_size)
+    reason = optimizer.evolve(state, generations)
+    # 증분 평가 상태는 프로세스 사이로 넘기지 않고 다음 에포크에서 필요할 때 다시 만든다
+    state.objective_states = [None] * len(state.population)
+    return state, optimizer.rng.bit_generator.state, reason
+
+def migrate(ranker: MultiObjectiveDietOptimizer, states: List[PopulationState], n_migrants: int):
+    # 고리 모양으로 섬 i의 상위 n_migrants개(프론트 순위, 혼잡 거리 순)가 섬 i+1의 하위 개체를 대체한다
+    emigrants = []
+    for state in states:
+        best = ranker.best_indices(state.population, state.fitnesses.tolist(), n_migrants)
+        emigrants.append((state.population[best], state.fitnesses[best]))
+
+    for i, (migrant_genomes, migrant_fitnesses) in enumerate(emigrants):
+        target = states[(i + 1) % len(states)]
+        ranking = ranker.best_indices(target.population, target.fitnesses.tolist(), len(target.population))
+        worst = ranking[len(ranking) - len(migrant_genomes):]
+        target.population = target.population.copy()
+        target.fitnesses = target.fitnesses.copy()
+        target.population[worst] = migrant_genomes
+        target.fitnesses[worst] = migrant_fitnesses
+        for index in worst:
+            target.objective_states[index] = None
+
+def optimize_islands(catalog: MenuCatalog, nutrient_constraints: NutrientConstraints, context: EvaluationContext, initial_diet: Diet,
+                     n_islands: int = 4, generations: int = 100, population_size: int = 50, migration_interval: int = 10,
+                     n_migrants: int = 2, seed: int = None, mutation_rates: List[float] = None, n_workers: int = None,
+                     **optimizer_options) -> List[Diet]:
+    # 시드(와 선택적으로 변이율)가 다른 섬 n_islands개를 migration_interval세대씩 따로 진화시키고, 그 사이마다 이주시킨다.
+    # 어느 섬이든 종료 조건(개선 식단 target_improved_diets개 이상)을 채우거나 합친 아카이브가 채우면 멈추고, 모든 섬의 아카이브를 합친 결과를 돌려준다.
+    # optimizer_options는 MultiObjectiveDietOptimizer에 그대로 넘긴다 (mutation, cache_size 등)
+    if mutation_rates is None:
+        mutation_rates = [0.1] * n_islands
+    if len(mutation_rates) != n_islands:
+        raise ValueError(f"Expected {n_islands} mutation rates, got {len(mutation_rates)}")
+    if n_workers is None:
+        n_workers = min(n_islands, os.cpu_count() or 1)
+
+    seeds = np.random.SeedSequence(seed).spawn(n_islands)
+    ranker = MultiObjectiveDietOptimizer(catalog, nutrient_constraints, context, cache_size=0, delta_max_changes=0)
+    initial_genome = catalog.encode_diet(initial_diet)
+    initial_fitness = ranker.fitness(initial_diet)
+
+    states, rng_states = [None] * n_islands, [None] * n_islands
+    executor = None
+    if n_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker,
+                                       initargs=(context, catalog, nutrient_constraints, optimizer_options))
+    else:
+        init_worker(context, catalog, nutrient_constraints, optimizer_options)
+
+    try:
+        completed, terminated = 0, False
+        while completed < generations and not terminated:
+            epoch = min(migration_interval, generations - completed)
+            tasks = [(seeds[i], rng_states[i], mutation_rates[i], initial_genome, initial_fitness, states[i], epoch, population_size)
+                     for i in range(n_islands)]
+            if executor is not None:
+                results = list(executor.map(_run_epoch, *zip(*tasks)))
+            else:
+                results = [_run_epoch(*task) for task in tasks]
+            states, rng_states, reasons = (list(values) for values in zip(*results))
+            completed += epoch
+
+            # 섬별 아카이브를 합친 것이 전체 결과이며, 종료 조건도 합친 아카이브로 본다
+            archive = ParetoArchive(initial_fitness, states[0].archive.max_size)
+            for state in states:
+                archive.merge(state.archive)
+            target = optimizer_options.get('target_improved_diets', 5)
+            terminated = 'improved' in reasons or (target is not None and archive.improved_count >= target)
+            if not terminated and completed < generations:
+                migrate(ranker, states, n_migrants)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if terminated:
+        print(f"Termination condition met after {completed} generations on {n_islands} islands: {archive.improved_count} improved diets found.")
+    else:
+        print(f"Maximum generations reached. Best result so far: {len(archive)} solutions in merged Pareto archive.")
+    return catalog.decode_genomes(archive.genomes, initial_diet, initial_genome)
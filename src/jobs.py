@@ -0,0 +1,117 @@
+import threading
+import traceback
+import uuid
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+from telemetry import GenerationRecord, OptimizationObserver
+
+OBJECTIVE_NAMES = ['nutrition', 'cost', 'harmony', 'diversity']
+
+class OptimizationJob(OptimizationObserver):
+    # 백그라운드 스레드에서 도는 최적화 한 건. 옵저버로 붙어 진행 상황을 모으고 취소 요청을 전달한다
+    def __init__(self, job_id: str, key: Hashable, generations: int):
+        self.job_id = job_id
+        self.key = key
+        self.generations = generations
+        self.status = 'pending'  # pending -> running -> done / cancelled / failed
+        self.generation = 0
+        self.front_fitnesses = np.empty((0, len(OBJECTIVE_NAMES)))
+        self.history = []
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def on_generation(self, optimizer, record: GenerationRecord):
+        row = {'generation': record.generation + 1, 'front_size': len(record.front_fitnesses)}
+        row.update(zip(OBJECTIVE_NAMES, record.front_fitnesses.max(axis=0).tolist()))
+        with self._lock:
+            self.generation = record.generation + 1
+            self.front_fitnesses = record.front_fitnesses.copy()
+            self.history.append(row)
+
+    def should_stop(self, optimizer) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'cancelled', 'failed')
+
+    def snapshot(self) -> Dict[str, Any]:
+        # UI 스레드가 읽는 동안 세대 기록이 바뀌지 않도록 복사본을 돌려준다
+        with self._lock:
+            return {'status': self.status, 'generation': self.generation, 'generations': self.generations,
+                    'front_fitnesses': self.front_fitnesses, 'history': list(self.history), 'error': self.error}
+
+class JobManager:
+    # 작업은 key(업로드 파일 해시, 파라미터 등)로 묶인다. 같은 key의 진행 중이거나 끝난 작업이 있으면 새로 돌리지 않고 그것을 돌려준다
+    def __init__(self, max_workers: int = 2, max_jobs: int = 32):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='optimization')
+        self._jobs: Dict[str, OptimizationJob] = {}
+        self._by_key: 'OrderedDict[Hashable, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, generations: int, run: Callable[[OptimizationJob], Any]) -> OptimizationJob:
+        with self._lock:
+            job = self._jobs.get(self._by_key.get(key))
+            if job is not None and job.status in ('pending', 'running', 'done'):
+                self._by_key.move_to_end(key)
+                return job
+
+            # 취소되거나 실패한 작업은 결과를 재사용하지 않고 다시 돌린다
+            if job is not None:
+                del self._jobs[job.job_id]
+            job = OptimizationJob(uuid.uuid4().hex, key, generations)
+            self._jobs[job.job_id] = job
+            self._by_key[key] = job.job_id
+            self._by_key.move_to_end(key)
+            self._evict()
+
+        self._executor.submit(self._run, job, run)
+        return job
+
+    def get(self, job_id: Optional[str]) -> Optional[OptimizationJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, key: Hashable) -> Optional[OptimizationJob]:
+        with self._lock:
+            return self._jobs.get(self._by_key.get(key))
+
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def _run(self, job: OptimizationJob, run: Callable[[OptimizationJob], Any]):
+        if job.cancelled:
+            job.status = 'cancelled'
+            return
+        job.status = 'running'
+        try:
+            job.result = run(job)
+        except Exception:
+            job.error = traceback.format_exc()
+            job.status = 'failed'
+        else:
+            job.status = 'cancelled' if job.cancelled else 'done'
+
+    def _evict(self):
+        # 오래된 작업부터 지우되, 아직 돌고 있는 작업은 남겨 둔다
+        for key in list(self._by_key):
+            if len(self._by_key) <= self.max_jobs:
+                break
+            job = self._jobs[self._by_key[key]]
+            if job.finished:
+                del self._by_key[key]
+                del self._jobs[job.job_id]
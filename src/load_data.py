@@ -1,48 +1,29 @@
+import os
+import numpy as np
 import pandas as pd
 from typing import List, Dict
 from Diet_class import Ingredient, Menu, Meal, Diet, NutrientConstraints
 from openpyxl import load_workbook
+from data_cache import load_cached
+from catalog import NUTRIENT_NAMES
 
-def load_and_process_data(diet_db_path: str, menu_db_path: str, ingre_db_path: str) -> Diet:
-    diet_df = pd.read_excel(diet_db_path, sheet_name='sample')
-    menu_ingre_df = pd.read_excel(menu_db_path, sheet_name='ingredient')
-    menu_nutri_df = pd.read_excel(menu_db_path, sheet_name='nutrient')
-    menu_cat_df = pd.read_excel(menu_db_path, sheet_name='category')
-    ingre_price_df = pd.read_excel(ingre_db_path)
+def get_file_path(filename):
+    # 저장소의 data 폴더 아래 파일 경로
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, 'data', filename)
 
-    menu_categories = dict(zip(menu_cat_df['Menu'], menu_cat_df['Category']))
+def load_and_process_data(diet_db_path, menu_db_path: str, ingre_db_path: str) -> Diet:
+    menu_objects = {menu.name: menu for menu in load_all_menus(menu_db_path, ingre_db_path)}
 
-    # ingredient_dict 생성
-    ingredient_dict = {}
-    for _, row in menu_ingre_df.iterrows():
-        menu_name = row['Menu']
-        ingredient_name = row['Ingredient']
-        amount = row['Amount_g']
-        
-        price_per_100g = ingre_price_df[ingre_price_df['Ingredient'] == ingredient_name]['Price']
-        price = (price_per_100g.values[0] / 100) * amount if not price_per_100g.empty else 0
-        
-        if menu_name not in ingredient_dict:
-            ingredient_dict[menu_name] = []
-        
-        ingredient_dict[menu_name].append(Ingredient(name=ingredient_name, price=price, amount_g=amount))
+    # 업로드된 파일 객체는 수정 시각이 없으므로 경로로 주어진 식단만 캐시한다
+    if isinstance(diet_db_path, (str, os.PathLike)):
+        cache_name = 'diet_' + os.path.splitext(os.path.basename(diet_db_path))[0]
+        return load_cached(cache_name, [diet_db_path, menu_db_path, ingre_db_path],
+                           lambda: read_diet(diet_db_path, menu_objects))
+    return read_diet(diet_db_path, menu_objects)
 
-    # menu_objects 생성
-    menu_objects = {}
-    for _, row in menu_nutri_df.iterrows():
-        menu_name = row['Menu']
-        nutrients = {
-            'energy_kcal': row['energy_kcal'],
-            'carbohydrate_g': row['carbohydrate_g'],
-            'protein_g': row['protein_g'],
-            'fat_g': row['fat_g'],
-            'Ca_mg': row['Ca_mg']
-        }
-        ingredients = ingredient_dict.get(menu_name, [])
-        category = menu_categories.get(menu_name, "Unknown")
-        
-        menu = Menu(name=menu_name, nutrients=nutrients, ingredients=ingredients, category=category)
-        menu_objects[menu_name] = menu
+def read_diet(diet_db_path, menu_objects: Dict[str, Menu]) -> Diet:
+    diet_df = pd.read_excel(diet_db_path, sheet_name='sample')
 
     # Diet 생성 
     meals = []
@@ -54,40 +35,41 @@ def load_and_process_data(diet_db_path: str, menu_db_path: str, ingre_db_path: s
     return Diet(meals)
 
 def load_all_menus(menu_db_path: str, ingre_db_path: str) -> List[Menu]:
+    return load_cached('menus', [menu_db_path, ingre_db_path], lambda: _build_menus(menu_db_path, ingre_db_path))
+
+def _build_menus(menu_db_path: str, ingre_db_path: str) -> List[Menu]:
     menu_ingre_df = pd.read_excel(menu_db_path, sheet_name='ingredient')
     menu_nutri_df = pd.read_excel(menu_db_path, sheet_name='nutrient')
     menu_cat_df = pd.read_excel(menu_db_path, sheet_name='category')
     ingre_price_df = pd.read_excel(ingre_db_path)
 
+    return build_menus(menu_ingre_df, menu_nutri_df, menu_cat_df, ingre_price_df)
+
+def price_ingredients(menu_ingre_df: pd.DataFrame, ingre_price_df: pd.DataFrame) -> pd.DataFrame:
+    # 재료명으로 가격표를 한 번에 조인한다. 가격표에 중복된 재료가 있으면 첫 행을, 없는 재료는 0원을 쓴다
+    price_per_100g = ingre_price_df.drop_duplicates('Ingredient', keep='first').set_index('Ingredient')['Price']
+    priced = menu_ingre_df[['Menu', 'Ingredient', 'Amount_g']].copy()
+    in_price_table = priced['Ingredient'].isin(price_per_100g.index)
+    priced['Price'] = np.where(in_price_table, priced['Ingredient'].map(price_per_100g) / 100 * priced['Amount_g'], 0)
+    return priced
+
+def build_menus(menu_ingre_df: pd.DataFrame, menu_nutri_df: pd.DataFrame, menu_cat_df: pd.DataFrame, ingre_price_df: pd.DataFrame) -> List[Menu]:
     # 카테고리 정보를 딕셔너리로 변환
     menu_categories = dict(zip(menu_cat_df['Menu'], menu_cat_df['Category']))
 
-    # ingredient_dict 생성
+    # ingredient_dict 생성 (각 시트를 한 번씩만 순회)
+    priced = price_ingredients(menu_ingre_df, ingre_price_df)
     ingredient_dict = {}
-    for _, row in menu_ingre_df.iterrows():
-        menu_name = row['Menu']
-        ingredient_name = row['Ingredient']
-        amount = row['Amount_g']
-        
-        price_per_100g = ingre_price_df[ingre_price_df['Ingredient'] == ingredient_name]['Price']
-        price = (price_per_100g.values[0] / 100) * amount if not price_per_100g.empty else 0
-        
+    for menu_name, ingredient_name, amount, price in zip(priced['Menu'], priced['Ingredient'], priced['Amount_g'], priced['Price']):
         if menu_name not in ingredient_dict:
             ingredient_dict[menu_name] = []
-        
         ingredient_dict[menu_name].append(Ingredient(name=ingredient_name, price=price, amount_g=amount))
 
     # menu_objects 생성
     all_menus = []
-    for _, row in menu_nutri_df.iterrows():
-        menu_name = row['Menu']
-        nutrients = {
-            'energy_kcal': row['energy_kcal'],
-            'carbohydrate_g': row['carbohydrate_g'],
-            'protein_g': row['protein_g'],
-            'fat_g': row['fat_g'],
-            'Ca_mg': row['Ca_mg']
-        }
+    nutrient_columns = [menu_nutri_df[nutrient].tolist() for nutrient in NUTRIENT_NAMES]
+    for menu_name, *values in zip(menu_nutri_df['Menu'], *nutrient_columns):
+        nutrients = dict(zip(NUTRIENT_NAMES, values))
         ingredients = ingredient_dict.get(menu_name, [])
         category = menu_categories.get(menu_name, "Unknown")
         
@@ -121,8 +103,9 @@ def create_nutrient_constraints():
     
     return NutrientConstraints(min_values=min_values, max_values=max_values, weights=weights)
 
-def load_sample_file(sample_path):
-    sample = pd.read_excel(sample_path).iloc[4:22, 2:8]
+def load_sample_file(sample_path, days: int = 6):
+    # 샘플 양식은 3열부터 하루에 한 열씩 놓이므로, 여러 주짜리 양식이면 days만 늘리면 된다
+    sample = pd.read_excel(sample_path).iloc[4:22, 2:2 + days]
 
     def extract_main_dish(dish):
         return dish.split('/')[0] if '/' in dish else dish
@@ -130,7 +113,7 @@ def load_sample_file(sample_path):
     result = []
 
     meal_types = ['Breakfast', 'Lunch', 'Dinner']
-    for day in range(6):
+    for day in range(days):
         for idx, meal_type in enumerate(meal_types):
             start_idx = idx * 6
             menu_items = sample.iloc[start_idx:start_idx + 6, day].tolist()
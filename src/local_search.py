@@ -0,0 +1,82 @@
+import numpy as np
+from typing import Tuple
+from catalog import MenuCatalog
+from delta_evaluation import DeltaEvaluator, ObjectiveState
+
+class LocalSearch:
+    # 한 슬롯을 같은 카테고리의 다른 메뉴로 바꾼 이웃을 증분 평가로 훑고, 현재 식단을 지배하는 첫 이웃으로 옮긴다 (first-improvement).
+    # 영양 기준을 벗어난 끼니의 슬롯부터 시도하고, 슬롯마다 같은 카테고리 후보 전체를 영양·비용·조화 변화량으로 먼저 거른 뒤
+    # 남은 후보 중 최대 tries_per_slot개만 증분 평가한다
+    def __init__(self, catalog: MenuCatalog, delta: DeltaEvaluator, tries_per_slot: int = 3):
+        self.catalog = catalog
+        self.delta = delta
+        self.tries_per_slot = tries_per_slot
+
+    def improve(self, genome: np.ndarray, fitness: np.ndarray, budget: int, rng: np.random.Generator,
+                frozen_meals: int = 0) -> Tuple[ObjectiveState, np.ndarray, int]:
+        # 반환값: (도착한 식단의 상태, 적합도, 쓴 평가 횟수). 한 바퀴를 다 돌아도 나아지지 않거나 예산을 다 쓰면 멈춘다.
+        # 앞의 frozen_meals끼의 슬롯은 바꾸지 않는다
+        state = self.delta.build(genome)
+        fitness = np.asarray(fitness, dtype=float)
+        evaluations = 0
+        improved = True
+        while improved and evaluations < budget:
+            improved = False
+            for meal, slot in self._slot_order(state, rng, frozen_meals).tolist():
+                if evaluations >= budget or improved:
+                    break
+                candidates = self._screen(state, fitness, meal, slot)
+                for new_menu in rng.permutation(candidates)[:self.tries_per_slot].tolist():
+                    candidate = self.delta.apply(state, np.array([[meal, slot]]), np.array([new_menu]))
+                    candidate_fitness = self.delta.scores(candidate)
+                    evaluations += 1
+                    if (candidate_fitness >= fitness).all() and (candidate_fitness > fitness).any():
+                        state, fitness, improved = candidate, candidate_fitness, True
+                        break
+                    if evaluations >= budget:
+                        break
+        return state, fitness, evaluations
+
+    def _screen(self, state: ObjectiveState, fitness: np.ndarray, meal: int, slot: int) -> np.ndarray:
+        # 영양·비용·조화 중 하나라도 나빠지는 후보는 현재 식단을 지배할 수 없으므로 다양성(비싼 항목)을 계산하기 전에 뺀다.
+        # 실제 수락 여부는 증분 평가한 정확한 점수로 정하므로, 여기서는 반올림 오차만큼 느슨하게 비교한다
+        catalog, delta = self.catalog, self.delta
+        old_menu = state.genome[meal, slot]
+        category = catalog.categories[old_menu]
+        candidates = catalog.category_members[catalog.category_starts[category]:catalog.category_starts[category + 1]]
+        candidates = candidates[candidates != old_menu]
+
+        def violations(nutrients: np.ndarray) -> np.ndarray:
+            return ((nutrients < delta.min_values) | (nutrients > delta.max_values)).sum(axis=-1)
+        base = state.meal_nutrients[meal] - catalog.nutrients[old_menu]
+        keep = violations(base + catalog.nutrients[candidates]) <= violations(state.meal_nutrients[meal])
+        keep &= catalog.costs[candidates] <= catalog.costs[old_menu] + 1e-9
+
+        context = delta.context
+        if state.harmony_pairs > 0 or (delta.history_index[candidates] >= 0).any():
+            flat = meal * state.genome.shape[1] + slot
+            others = np.delete(state.history_genome, flat)
+            others = others[others >= 0]
+            old_history = state.history_genome[flat]
+            harmony_sum, harmony_pairs = state.harmony_sum, state.harmony_pairs
+            if old_history >= 0:
+                harmony_sum -= int(context.harmony_matrix[old_history, others].sum())
+                harmony_pairs -= len(others)
+            new_history = delta.history_index[candidates]
+            known = new_history >= 0
+            sums = np.full(len(candidates), harmony_sum, dtype=np.int64)
+            pairs = np.full(len(candidates), harmony_pairs, dtype=np.int64)
+            if known.any() and len(others) > 0:
+                sums[known] += context.harmony_matrix[new_history[known][:, np.newaxis], others[np.newaxis, :]].sum(axis=1)
+                pairs[known] += len(others)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = np.where(pairs > 0, (sums - pairs * context.min_harmony) / (context.max_harmony - context.min_harmony) * 100 / pairs, 0.0)
+            keep &= scores >= fitness[2] - 1e-9
+        return candidates[keep]
+
+    def _slot_order(self, state: ObjectiveState, rng: np.random.Generator, frozen_meals: int = 0) -> np.ndarray:
+        slots = np.argwhere(state.genome[frozen_meals:] >= 0)
+        slots[:, 0] += frozen_meals
+        slots = slots[rng.permutation(len(slots))]
+        violating = ((state.meal_nutrients < self.delta.min_values) | (state.meal_nutrients > self.delta.max_values)).any(axis=1)
+        return slots[np.argsort(~violating[slots[:, 0]], kind='stable')]
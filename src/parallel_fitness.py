@@ -0,0 +1,28 @@
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from Diet_class import NutrientConstraints
+from catalog import MenuCatalog
+from evaluation_function import EvaluationContext, evaluate_population
+
+# 워커 프로세스마다 한 번만 전달받아 보관하는 데이터. 병렬 평가, 배치 실행, 섬 모델이 각자 필요한 값을 튜플로 넘긴다
+_worker_data = None
+
+def init_worker(*data):
+    # ProcessPoolExecutor의 initializer. 워커를 쓰지 않을 때는 현재 프로세스에서 직접 불러도 된다
+    global _worker_data
+    _worker_data = data
+
+def worker_data() -> tuple:
+    return _worker_data
+
+def _evaluate_chunk(population: np.ndarray) -> np.ndarray:
+    context, catalog, nutrient_constraints = worker_data()
+    return evaluate_population(context, catalog, population, nutrient_constraints)
+
+def create_fitness_executor(context: EvaluationContext, catalog: MenuCatalog, nutrient_constraints: NutrientConstraints, n_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker, initargs=(context, catalog, nutrient_constraints))
+
+def evaluate_population_parallel(executor: Executor, population: np.ndarray, n_chunks: int) -> np.ndarray:
+    # 작업에는 작은 정수 게놈 배열만 담기고, 결과는 제출 순서대로 모으므로 시드가 같으면 결과도 같다
+    chunks = [chunk for chunk in np.array_split(population, n_chunks) if len(chunk) > 0]
+    return np.concatenate(list(executor.map(_evaluate_chunk, chunks)))
@@ -0,0 +1,57 @@
+import numpy as np
+from typing import Tuple
+from Diet_class import NutrientConstraints
+from catalog import MenuCatalog, NUTRIENT_NAMES
+
+class NutritionRepair:
+    # 영양 기준을 벗어난 끼니 하나를 골라, 같은 카테고리 메뉴로 슬롯 하나를 바꿔 위반 수가 가장 많이 줄어드는 교체를 한다 (같으면 기준 밖으로 벗어난 거리가 작은 쪽).
+    # 위반 수가 그대로인 교체는 영양 점수는 못 올리면서 비용만 늘리기 쉬워 하지 않는다.
+    # 목표가 한 점이 아니라 상자(최소~최대) 모양이라 최근접 탐색 구조 대신, 카테고리별로 연속 배치한 영양소 행렬을 통째로 비교한다
+    def __init__(self, catalog: MenuCatalog, nutrient_constraints: NutrientConstraints):
+        self.catalog = catalog
+        self.min_values = np.array([nutrient_constraints.min_values[nutrient] for nutrient in NUTRIENT_NAMES])
+        self.max_values = np.array([nutrient_constraints.max_values[nutrient] for nutrient in NUTRIENT_NAMES])
+        # 영양소마다 단위가 달라 벗어난 양을 허용 범위 폭으로 나눠 더한다
+        width = self.max_values - self.min_values
+        self.scale = np.where(width > 0, width, 1)
+        # member_nutrients[category_starts[c]:category_starts[c+1]]가 카테고리 c 메뉴들의 영양소
+        self.member_nutrients = catalog.nutrients[catalog.category_members]
+
+    def violations(self, nutrients: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        below = np.maximum(self.min_values - nutrients, 0)
+        above = np.maximum(nutrients - self.max_values, 0)
+        return ((below > 0) | (above > 0)).sum(axis=-1), ((below + above) / self.scale).sum(axis=-1)
+
+    def repair_genome(self, genome: np.ndarray, rng: np.random.Generator, frozen_meals: int = 0) -> np.ndarray:
+        # 앞의 frozen_meals끼는 고치지 않는다 (MultiObjectiveDietOptimizer.optimize_rolling 참고)
+        catalog = self.catalog
+        meal_nutrients = catalog.nutrients[genome].sum(axis=1)
+        counts, distances = self.violations(meal_nutrients)
+        violating = np.flatnonzero(counts[frozen_meals:] > 0) + frozen_meals
+        if len(violating) == 0:
+            return genome
+
+        meal = violating[rng.integers(len(violating))]
+        best_count, best_distance, best_slot, best_menu = counts[meal], distances[meal], None, None
+        for slot in np.flatnonzero(genome[meal] >= 0).tolist():
+            old_menu = genome[meal, slot]
+            category = catalog.categories[old_menu]
+            start, end = catalog.category_starts[category], catalog.category_starts[category + 1]
+            candidate_counts, candidate_distances = self.violations(meal_nutrients[meal] - catalog.nutrients[old_menu] + self.member_nutrients[start:end])
+            best = np.lexsort((candidate_distances, candidate_counts))[0]
+            if candidate_counts[best] < best_count or (best_slot is not None and candidate_counts[best] == best_count and candidate_distances[best] < best_distance):
+                best_count, best_distance = candidate_counts[best], candidate_distances[best]
+                best_slot, best_menu = slot, catalog.category_members[start + best]
+
+        if best_slot is None:
+            return genome
+        repaired = genome.copy()
+        repaired[meal, best_slot] = best_menu
+        return repaired
+
+    def repair(self, population: np.ndarray, rng: np.random.Generator, rate: float, frozen_meals: int = 0) -> np.ndarray:
+        # 각 개체를 rate 확률로 고친다. 고치지 않은 개체는 그대로 둔다
+        repaired = population.copy()
+        for i in np.flatnonzero(rng.random(len(population)) < rate).tolist():
+            repaired[i] = self.repair_genome(population[i], rng, frozen_meals)
+        return repaired
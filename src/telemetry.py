@@ -0,0 +1,112 @@
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+PHASES = ['evaluation', 'sorting', 'selection', 'variation', 'local_search']
+
+@dataclass
+class GenerationRecord:
+    generation: int
+    phase_seconds: Dict[str, float]
+    evaluations: int
+    front_fitnesses: np.ndarray
+    cache_stats: Dict[str, float] = field(default_factory=dict)
+
+class OptimizationObserver:
+    # optimize()에 observers로 넘기면 세대마다 호출된다. 필요한 메서드만 재정의하면 된다
+    def on_start(self, optimizer, initial_fitness: List[float], population_fitnesses: np.ndarray):
+        pass
+
+    def on_generation(self, optimizer, record: GenerationRecord):
+        pass
+
+    def on_window(self, optimizer, window: int, initial_fitness: List[float], population_fitnesses: np.ndarray):
+        # optimize_rolling이 창마다(첫 창 포함, on_start 다음에) 부른다. 창마다 평가하는 끼니가 달라 점수 범위도 달라진다
+        pass
+
+    def on_finish(self, optimizer, front_fitnesses: np.ndarray):
+        pass
+
+    def should_stop(self, optimizer) -> bool:
+        # 세대 시작마다 확인한다. True를 돌려주면 그 시점의 파레토 프론트를 반환하고 끝낸다
+        return False
+
+class TimeLimit(OptimizationObserver):
+    # 만든 시점부터 seconds초가 지나면 다음 세대 시작 때 최적화를 멈춘다 (진행 중인 세대는 끝까지 돈다)
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.perf_counter() + seconds
+        self.expired = False
+
+    def should_stop(self, optimizer) -> bool:
+        self.expired = self.expired or time.perf_counter() > self.deadline
+        return self.expired
+
+def estimate_hypervolume(front_fitnesses: np.ndarray, reference_point: np.ndarray, n_samples: int = 4096, seed: int = 0) -> float:
+    # 기준점보다 모든 목적에서 나은 점들이 지배하는 부피의 몬테카를로 추정값
+    front_fitnesses = np.asarray(front_fitnesses, dtype=float)
+    reference_point = np.asarray(reference_point, dtype=float)
+    if len(front_fitnesses) == 0:
+        return 0.0
+    points = front_fitnesses[(front_fitnesses >= reference_point).all(axis=1)]
+    if len(points) == 0:
+        return 0.0
+
+    upper = points.max(axis=0)
+    box_volume = np.prod(upper - reference_point)
+    if box_volume <= 0:
+        return 0.0
+
+    rng = np.random.default_rng(seed)
+    samples = reference_point + rng.random((n_samples, len(reference_point))) * (upper - reference_point)
+    dominated = (samples[:, np.newaxis, :] <= points[np.newaxis, :, :]).all(axis=2).any(axis=1)
+    return float(box_volume * dominated.mean())
+
+class GenerationRecorder(OptimizationObserver):
+    def __init__(self, hypervolume_samples: int = 4096, reference_point: List[float] = None):
+        self.hypervolume_samples = hypervolume_samples
+        self.fixed_reference_point = reference_point
+        self.reference_point = None
+        self.window = None
+        self.rows = []
+
+    def on_start(self, optimizer, initial_fitness: List[float], population_fitnesses: np.ndarray):
+        # 기준점을 정하지 않으면 초기 개체군의 목적별 최악값보다 1 낮은 점을 써서 실행 내내 같은 기준으로 비교한다
+        self._set_reference_point(population_fitnesses)
+        self.window = None
+        self.rows = []
+
+    def on_window(self, optimizer, window: int, initial_fitness: List[float], population_fitnesses: np.ndarray):
+        # 창별 최적화에서는 창마다 기준점을 다시 정하고 행에 창 번호를 남긴다. 하이퍼볼륨은 같은 창 안에서만 비교할 수 있다
+        self._set_reference_point(population_fitnesses)
+        self.window = window
+
+    def _set_reference_point(self, population_fitnesses: np.ndarray):
+        if self.fixed_reference_point is not None:
+            self.reference_point = np.asarray(self.fixed_reference_point, dtype=float)
+        else:
+            self.reference_point = np.asarray(population_fitnesses, dtype=float).min(axis=0) - 1
+
+    def on_generation(self, optimizer, record: GenerationRecord):
+        total_seconds = sum(record.phase_seconds.values())
+        evaluation_seconds = record.phase_seconds.get('evaluation', 0.0)
+        row = {'generation': record.generation}
+        if self.window is not None:
+            row['window'] = self.window
+        row.update({f'{phase}_s': record.phase_seconds.get(phase, 0.0) for phase in PHASES})
+        row['total_s'] = total_seconds
+        row['evaluations'] = record.evaluations
+        row['evaluations_per_s'] = record.evaluations / evaluation_seconds if evaluation_seconds > 0 else 0.0
+        row['front_size'] = len(record.front_fitnesses)
+        if self.hypervolume_samples > 0:
+            row['hypervolume'] = estimate_hypervolume(record.front_fitnesses, self.reference_point, self.hypervolume_samples)
+        row.update({f'cache_{name}': value for name, value in record.cache_stats.items()})
+        self.rows.append(row)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rows)
+
+    def to_csv(self, path: str):
+        self.to_dataframe().to_csv(path, index=False)
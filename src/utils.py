@@ -1,21 +1,22 @@
 import pandas as pd
 
+MEAL_TYPES = ['Breakfast', 'Lunch', 'Dinner']
+
 def diet_to_dataframe(diet, title: str) -> pd.DataFrame:
-    meals_dict = {f'Day {i+1}': [] for i in range(7)}
-    
-    for i in range(7):
-        day_meals = {
-            'Breakfast': "",
-            'Lunch': "",
-            'Dinner': ""
-        }
-        for meal in diet.meals[i*3:(i+1)*3]: 
-            menu_names = "\n".join([f"({menu.category}) {menu.name}" for menu in meal.menus])
-            day_meals[meal.meal_type.capitalize()] = menu_names
-        
-        meals_dict[f'Day {i+1}'].extend([day_meals['Breakfast'], day_meals['Lunch'], day_meals['Dinner']])
-    
-    df = pd.DataFrame(meals_dict, index=['Breakfast', 'Lunch', 'Dinner'])
+    # 식단 순서대로 날짜가 바뀔 때마다 새 열을 연다. 주마다 Day 번호를 1부터 다시 매긴 여러 주짜리 식단도 앞 주를 덮어쓰지 않는다
+    days = []
+    previous_date = None
+    for meal in diet.meals:
+        if not days or meal.date != previous_date:
+            days.append(dict.fromkeys(MEAL_TYPES, ""))
+            previous_date = meal.date
+        meal_type = meal.meal_type.capitalize()
+        if days[-1].get(meal_type):
+            raise ValueError(f'Day {meal.date} has more than one {meal.meal_type} meal')
+        days[-1][meal_type] = "\n".join([f"({menu.category}) {menu.name}" for menu in meal.menus])
+
+    meals_dict = {f'Day {i+1}': [day_meals[meal_type] for meal_type in MEAL_TYPES] for i, day_meals in enumerate(days)}
+    df = pd.DataFrame(meals_dict, index=MEAL_TYPES)
     df.columns.name = title 
     
     return df
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# src 모듈은 평평한 구조로 서로 이름만으로 import하므로 src를 경로에 넣는다
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from Diet_class import Ingredient, Menu, Meal, Diet
+from evaluation_function import build_evaluation_context
+from history_model import HistoryModel
+
+def make_meals(n_meals, seed=0):
+    rng = np.random.default_rng(seed)
+    menus = [Menu(f'menu_{i}', [100, 10, 5, 3, 20], [Ingredient(f'ingredient_{i}', float(rng.integers(100, 1000)), 50.0)], 'category')
+             for i in range(12)]
+    return [Meal([menus[i] for i in rng.choice(len(menus), 3, replace=False)], str(day // 3 + 1), 'lunch')
+            for day in range(n_meals)]
+
+def assert_same_context(model, meals):
+    context, expected = model.to_context(), build_evaluation_context(Diet(meals))
+    assert (context.min_cost, context.max_cost) == (expected.min_cost, expected.max_cost)
+    assert (context.min_harmony, context.max_harmony) == (expected.min_harmony, expected.max_harmony)
+    assert context.menu_counts == expected.menu_counts
+    harmony, expected_harmony = context.harmony_matrix, expected.harmony_matrix
+    assert harmony.menus == expected_harmony.menus
+    np.testing.assert_array_equal(harmony.pair_keys, expected_harmony.pair_keys)
+    np.testing.assert_array_equal(harmony.pair_counts, expected_harmony.pair_counts)
+
+def test_remove_meals_matches_rebuild():
+    meals = make_meals(60)
+    model = HistoryModel.from_meals(meals)
+    model.remove_meals([meals[10], meals[3], meals[40]])
+    model.remove_oldest(5)
+    kept = [meal for i, meal in enumerate(meals) if i not in (3, 10, 40)][5:]
+    assert len(model) == len(kept)
+    assert_same_context(model, kept)
+
+def test_remove_meals_unknown_meal_changes_nothing():
+    meals = make_meals(60)
+    model = HistoryModel.from_meals(meals)
+    before = model.to_context()
+    unknown = Meal([Menu('unknown', [0, 0, 0, 0, 0], [], 'category')], '99', 'lunch')
+
+    with pytest.raises(ValueError):
+        model.remove_meals([meals[0], unknown])
+
+    # 앞의 끼니도 빠지지 않고, 만들어 둔 평가 기준도 그대로 맞다
+    assert len(model) == len(meals)
+    assert model.to_context() is before
+    assert_same_context(model, meals)
+
+def test_remove_meals_more_copies_than_recorded_changes_nothing():
+    meals = make_meals(30)
+    model = HistoryModel.from_meals(meals)
+    with pytest.raises(ValueError):
+        model.remove_meals([meals[5], meals[5]])
+    assert len(model) == len(meals)
+    assert_same_context(model, meals)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from MOO import MultiObjectiveDietOptimizer
+
+@pytest.fixture
+def optimizer():
+    # 정렬·혼잡 거리는 카탈로그나 평가 기준을 쓰지 않는다
+    return MultiObjectiveDietOptimizer.__new__(MultiObjectiveDietOptimizer)
+
+def random_fitnesses(rng, n):
+    # 값의 범위를 좁게 잡아 같은 점수와 같은 개체가 많이 나오게 한다
+    return rng.integers(0, 4, size=(n, 4)).astype(float)
+
+@pytest.mark.parametrize('seed', range(50))
+def test_non_dominated_sort_matches_reference(optimizer, seed):
+    rng = np.random.default_rng(seed)
+    fitnesses = random_fitnesses(rng, int(rng.integers(1, 80)))
+    population = np.zeros((len(fitnesses), 1))
+
+    fast = optimizer.non_dominated_sort(population, fitnesses.tolist())
+    reference = optimizer.non_dominated_sort_reference(population, fitnesses.tolist())
+
+    assert [sorted(front) for front in fast] == [sorted(front) for front in reference]
+
+@pytest.mark.parametrize('seed', range(50))
+def test_crowding_distance_matches_reference(optimizer, seed):
+    rng = np.random.default_rng(seed)
+    fitnesses = random_fitnesses(rng, int(rng.integers(2, 80)))
+
+    fast = optimizer.crowding_distance(fitnesses.tolist())
+    reference = optimizer.crowding_distance_reference(fitnesses.tolist())
+
+    np.testing.assert_allclose(fast, reference)
+
+def test_non_dominated_sort_empty(optimizer):
+    assert optimizer.non_dominated_sort(np.zeros((0, 1)), []) == []